@@ -1,59 +1,191 @@
 import os
-import dspy
-from openai import AzureOpenAI
-
-# Step 1: Configure Azure OpenAI (reuse logic from career_advisor.py)
-from openai import AzureOpenAI
-
-client = AzureOpenAI(
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-    api_key=os.getenv("AZURE_OPENAI_KEY"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION")
-)
-
-dspy.configure(lm=(
-    dspy.LM(
-        model=os.getenv("AZURE_OPENAI_MODEL_NAME"),
-        api_key=os.getenv("AZURE_OPENAI_KEY"),
-        api_base=os.getenv("AZURE_OPENAI_ENDPOINT"),
-        api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
-        deployment_id=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
-    )
-))
+import time
+from llm_router import get_router
+from telemetry import span, traced
+from response_cache import get_response_cache, make_cache_key
+from level_assessment import LevelAssessor, format_verdict
+from prompt_builder import PROMPT_TOKEN_BUDGET, SYSTEM_PROMPT, build_prompt
+from pregenerate import get_pregenerated_store
+from context_retrieval import get_context_retriever
+
+
+# Bump whenever SYSTEM_PROMPT or the prompt template changes so cached responses are not reused
+PROMPT_VERSION = "5"
+# Completion cap for the recommendation; the retrieved framework context keeps short answers specific
+MAX_TOKENS = int(os.getenv("RECOMMENDATION_MAX_TOKENS", "600"))
+# Print each prompt's size; it is always on the assessment.build_prompt span
+PRINT_PROMPT_STATS = os.getenv("PRINT_PROMPT_STATS", "").lower() in ("1", "true", "yes")
+
+@traced("assessment.assess_level")
+def assess_level(skills_dict, user_skill_ratings):
+    """
+    Scores the user's ratings locally against the designation's per-level skills.
+    Returns the LevelAssessor.assess dict (level, coverage, next_level, gaps).
+    """
+    return LevelAssessor(skills_dict).assess(user_skill_ratings)
+
+def _context(designation, skills_dict):
+    # Precomputed per designation (see context_retrieval.py), so this is normally a dict lookup
+    retriever = get_context_retriever()
+    if retriever is None:
+        return ""
+    with span("assessment.retrieve_context") as current_span:
+        context = retriever.context_for(designation, skills_dict)
+        current_span.set("chars", len(context))
+    return context
+
+def _build_prompt(designation, skills_dict, assessment, certifications, career_step=None):
+    context = _context(designation, skills_dict)
+    with span("assessment.build_prompt") as current_span:
+        prompt, stats = build_prompt(designation, skills_dict, assessment, certifications, career_step=career_step,
+                                     context=context)
+        for key, value in stats.items():
+            current_span.set(key, value)
+    if PRINT_PROMPT_STATS:
+        # Opt-in: bulk runs and the API would otherwise print a line per request
+        print(f"Prompt for {designation}: {stats['prompt_tokens']} tokens, "
+              f"{stats['gaps_listed']}/{stats['gaps_listed'] + stats['gaps_dropped']} gaps listed")
+    return prompt, stats
+
+def _usage(lm):
+    # dspy keeps the provider's token usage on the last history entry (empty on dspy cache hits)
+    history = getattr(lm, "history", None)
+    return (history[-1].get("usage") if history else None) or {}
+
+def _record_usage(current_span, usage):
+    if usage.get("prompt_tokens") is not None:
+        current_span.set("tokens_in", usage["prompt_tokens"])
+    if usage.get("completion_tokens") is not None:
+        current_span.set("tokens_out", usage["completion_tokens"])
+
+def _cached_recommendation(cache, cache_key):
+    with span("assessment.cache_get") as current_span:
+        cached = cache.get(cache_key)
+        current_span.set("hit", cached is not None)
+    return cached
+
+def prompt_fingerprint():
+    # Everything besides the profile that changes the generated text; stored recommendations match on it
+    retriever = get_context_retriever()
+    retrieval = retriever.version() if retriever is not None else "off"
+    return (f"{PROMPT_VERSION}:{PROMPT_TOKEN_BUDGET}:{MAX_TOKENS}:{retrieval}:"
+            f"{os.getenv('AZURE_OPENAI_MODEL_NAME', '')}")
 
-LEVELS = ['Entry', 'Mid', 'Senior', 'Expert']
+def _stored_recommendation(cache, cache_key, competency, designation, skills_dict, user_skill_ratings):
+    # Exact profile from the response cache, else the nearest pre-generated bucket (see pregenerate.py),
+    # which is keyed by competency since designation names repeat across competencies
+    cached = _cached_recommendation(cache, cache_key)
+    if cached is not None:
+        return cached[1]
+    store = get_pregenerated_store()
+    if store is None or competency is None:
+        return None
+    with span("assessment.pregenerated_get") as current_span:
+        found = store.nearest(competency, designation, skills_dict, user_skill_ratings, prompt_fingerprint())
+        current_span.set("hit", found is not None)
+        if found is not None:
+            current_span.set("distance", found[1])
+    return found[0] if found is not None else None
 
-SYSTEM_PROMPT = """
-You are an expert career advisor for software engineers. Given a user's self-assessed skill levels for a specific designation, deduce their current level (Entry, Mid, Senior, Expert) and recommend a career path to the next level. Use the provided skills and certifications from the competency framework. If the user is already at Expert, suggest exploring other designations or upskilling in trending areas.
-"""
+def _cache_key(designation, user_skill_ratings, certifications, career_step=None):
+    # The token budget, completion cap and retrieved context change the text, so they are part of the key
+    return make_cache_key(
+        designation, user_skill_ratings, certifications, prompt_fingerprint(),
+        os.getenv("AZURE_OPENAI_MODEL_NAME"), career_step
+    )
 
 def assess_and_recommend(
     designation: str,
     skills_dict,
     user_skill_ratings,
-    certifications
+    certifications,
+    use_cache=True,
+    include_recommendation=True,
+    career_step=None,
+    refresh=False,
+    competency=None
 ):
     """
-    Uses dspy LLM (Azure OpenAI) to assess the user's level and recommend a career path.
-    Returns (verdict, recommendation).
+    Assesses the user's level locally and, if include_recommendation is set, uses the dspy
+    LLM (through the provider router) to write the career path recommendation.
+    career_step (SkillGraph.path() for the next designation) puts the precomputed path
+    into the prompt. Identical profiles are served from the local response cache, and
+    profiles close to a pre-generated bucket of the designation in `competency` from the
+    pre-generated store, unless use_cache is False; refresh skips both lookups but still
+    stores the new text. Returns (verdict, recommendation).
     """
-    # Prepare the prompt
-    skill_ratings_str = "\n".join([f"{skill}: {level}" for skill, level in user_skill_ratings.items()])
-    certs_str = ", ".join(certifications)
-    prompt = f"""
-Designation: {designation}
-User Skill Ratings:\n{skill_ratings_str}
-Available Certifications: {certs_str}
-
-1. What is the user's current level (Entry, Mid, Senior, Expert)?
-2. What is the recommended career path to reach the next level? Summarise the skills to focus in table and certifications to pursue.
-If already at Expert, suggest upskilling or exploring other designations.
-"""
-    response = dspy.settings.lm(SYSTEM_PROMPT + "\n" + prompt)
+    assessment = assess_level(skills_dict, user_skill_ratings)
+    verdict = format_verdict(assessment)
+    if not include_recommendation:
+        return verdict, ""
+
+    cache_key = _cache_key(designation, user_skill_ratings, certifications, career_step)
+    cache = get_response_cache() if use_cache else None
+    if cache is not None and not refresh:
+        stored = _stored_recommendation(cache, cache_key, competency, designation, skills_dict, user_skill_ratings)
+        if stored is not None:
+            return verdict, stored
+
+    prompt, stats = _build_prompt(designation, skills_dict, assessment, certifications, career_step)
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+    def complete(provider):
+        response = provider.lm(messages=messages, max_tokens=MAX_TOKENS)
+        return response, _usage(provider.lm)
+    with span("llm.assess_and_recommend", prompt_tokens=stats['prompt_tokens']) as current_span:
+        response, usage = get_router().call(complete)
+        _record_usage(current_span, usage)
     # Ensure response is a string (dspy may return a list)
     if isinstance(response, list):
         response = "\n".join(str(r) for r in response)
-    lines = response.strip().split('\n')
-    verdict = lines[0] if lines else ""
-    recommendation = "\n".join(lines[1:]) if len(lines) > 1 else ""
+    recommendation = response.strip()
+    if cache is not None and recommendation:
+        cache.set(cache_key, verdict, recommendation)
     return verdict, recommendation
+
+def stream_recommendation(
+    designation: str,
+    skills_dict,
+    user_skill_ratings,
+    certifications,
+    use_cache=True,
+    career_step=None,
+    refresh=False,
+    competency=None
+):
+    """
+    Streaming variant of assess_and_recommend for the recommendation text.
+    Yields chunks as the LLM provider emits them (a cache or pre-generated hit yields the
+    stored text at once) and stores the completed recommendation in the response cache.
+    """
+    assessment = assess_level(skills_dict, user_skill_ratings)
+    verdict = format_verdict(assessment)
+    cache_key = _cache_key(designation, user_skill_ratings, certifications, career_step)
+    cache = get_response_cache() if use_cache else None
+    if cache is not None and not refresh:
+        stored = _stored_recommendation(cache, cache_key, competency, designation, skills_dict, user_skill_ratings)
+        if stored is not None:
+            yield stored
+            return
+
+    prompt, stats = _build_prompt(designation, skills_dict, assessment, certifications, career_step)
+    parts = []
+    # The span covers the whole stream; ttft_seconds is the time until the first content chunk
+    with span("llm.stream_recommendation", prompt_tokens=stats['prompt_tokens']) as current_span:
+        start = time.perf_counter()
+        for text in get_router().stream([
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ], max_tokens=MAX_TOKENS):
+            if not parts:
+                current_span.set("ttft_seconds", time.perf_counter() - start)
+            parts.append(text)
+            yield text
+        # Each streamed content chunk carries about one token
+        current_span.set("tokens_out", len(parts))
+    recommendation = "".join(parts).strip()
+    if cache is not None and recommendation:
+        cache.set(cache_key, verdict, recommendation)
@@ -0,0 +1,256 @@
+# Headless assessment service. Run with:
+#
+#   uvicorn api:app --host 0.0.0.0 --port 8000
+#
+# Stateless: competency data comes from the shared CompetencyData snapshot and every LLM
+# call goes through the process-wide provider router, so one warm backend can serve many
+# Streamlit replicas (set ASSESSMENT_API_URL in app.py's environment to use it).
+
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from ai_utils import assess_and_recommend, assess_level, stream_recommendation
+from bulk_assess import validate_row
+from competency_data import get_competency_data, get_competency_snapshot
+from pregenerate import get_pregenerated_store
+from response_cache import get_response_cache
+
+COMPETENCY_CSV = os.getenv("COMPETENCY_CSV", "competency-data.csv")
+
+
+class _Broadcast:
+    # Chunks of one in-flight stream so far; followers replay them, then wait for more
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Condition()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution whose result (or
+    error) every caller receives. The work runs as its own task, so a caller that
+    disconnects does not cancel it for the others. stream() does the same for a
+    generator: every caller receives all of its chunks.
+    """
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(asyncio.to_thread(fn, *args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _pump(self, key, broadcast: _Broadcast, fn: Callable, args, kwargs):
+        # Drives the blocking generator in worker threads, one chunk at a time
+        done = object()
+        try:
+            chunks = await asyncio.to_thread(fn, *args, **kwargs)
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, done)
+                if chunk is done:
+                    break
+                async with broadcast.changed:
+                    broadcast.chunks.append(chunk)
+                    broadcast.changed.notify_all()
+        except Exception as e:
+            broadcast.error = e
+        finally:
+            self._streams.pop(key, None)
+            async with broadcast.changed:
+                broadcast.done = True
+                broadcast.changed.notify_all()
+
+    async def stream(self, key, fn, *args, **kwargs) -> AsyncIterator[str]:
+        self.calls += 1
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = self._streams[key] = _Broadcast()
+            asyncio.ensure_future(self._pump(key, broadcast, fn, args, kwargs))
+        else:
+            self.coalesced += 1
+        sent = 0
+        while True:
+            async with broadcast.changed:
+                await broadcast.changed.wait_for(lambda: broadcast.done or len(broadcast.chunks) > sent)
+                chunks, done = broadcast.chunks[sent:], broadcast.done
+            for chunk in chunks:
+                yield chunk
+            sent += len(chunks)
+            if done:
+                if broadcast.error is not None:
+                    raise broadcast.error
+                return
+
+    def stats(self) -> Dict:
+        return {'calls': self.calls, 'coalesced': self.coalesced,
+                'inflight': len(self._inflight) + len(self._streams)}
+
+
+class AssessmentRequest(BaseModel):
+    competency: str
+    designation: str
+    skill_ratings: Dict[str, str]
+    include_recommendation: bool = True
+    # Skip stored and pre-generated recommendations and ask the LLM again
+    refresh: bool = False
+
+
+class PathQuery(BaseModel):
+    competency: str
+    designation: str
+    target: Optional[str] = None
+    skill_ratings: Dict[str, str] = {}
+
+
+class FitsQuery(BaseModel):
+    skill_ratings: Dict[str, str]
+    top_k: int = 5
+
+
+def _warm():
+    # The skill graph and index take a while to build; do it before the first request, not during it
+    data = get_competency_data(COMPETENCY_CSV)
+    data.skill_graph
+    data.skill_index
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    await asyncio.to_thread(_warm)
+    yield
+
+
+app = FastAPI(title="Career Growth Advisor API", lifespan=lifespan)
+assessments = SingleFlight()
+
+
+def _profile(competency: str, designation: str):
+    data = get_competency_data(COMPETENCY_CSV)
+    if not data.get_designations(competency):
+        raise HTTPException(404, f"Unknown competency '{competency}'")
+    skills_dict = data.get_skills_for_designation(competency, designation)
+    if not skills_dict:
+        raise HTTPException(404, f"Unknown designation '{designation}' for '{competency}'")
+    return data, skills_dict, data.get_certifications_for_designation(competency, designation)
+
+
+def _validated(request: AssessmentRequest):
+    data, skills_dict, certifications = _profile(request.competency, request.designation)
+    errors = validate_row({'competency': request.competency, 'designation': request.designation,
+                           'skill_ratings': request.skill_ratings}, data)
+    if errors:
+        raise HTTPException(422, "; ".join(errors))
+    career_step = data.skill_graph.path(request.competency, request.designation,
+                                        user_skill_ratings=request.skill_ratings)
+    return skills_dict, certifications, career_step
+
+
+@app.get("/health")
+def health():
+    pregenerated = get_pregenerated_store()
+    return {
+        'status': 'ok',
+        'competency_data': get_competency_snapshot(COMPETENCY_CSV).stats(),
+        'response_cache': get_response_cache().stats(),
+        'pregenerated': pregenerated.stats() if pregenerated is not None else None,
+        'singleflight': assessments.stats(),
+    }
+
+
+# Lookups are plain functions, so FastAPI runs them in its threadpool: after a CSV change the
+# competency data, skill graph and skill index are rebuilt there, not on the event loop
+@app.get("/competencies")
+def competencies() -> List[str]:
+    # As CompetencyData returns them, '' (the app's "no selection" entry) included
+    return get_competency_data(COMPETENCY_CSV).get_competencies()
+
+
+# Competency and designation names contain "/" (e.g. "AI/ML Engineering"), so they are query parameters
+@app.get("/designations")
+def designations(competency: str) -> List[str]:
+    found = get_competency_data(COMPETENCY_CSV).get_designations(competency)
+    if not found:
+        raise HTTPException(404, f"Unknown competency '{competency}'")
+    return found
+
+
+@app.get("/skills")
+def skills(competency: str, designation: str):
+    _, skills_dict, certifications = _profile(competency, designation)
+    return {'skills': skills_dict, 'certifications': certifications}
+
+
+@app.post("/career-paths")
+def career_paths(queries: List[PathQuery]) -> List[Optional[Dict]]:
+    # Skills and certifications from each designation to its target (default: the next one),
+    # answered from the precomputed skill graph; null where there is no step up
+    graph = get_competency_data(COMPETENCY_CSV).skill_graph
+    return graph.batch_paths(q.model_dump() for q in queries)
+
+
+@app.post("/fits")
+def fits(queries: List[FitsQuery]) -> List[List[Dict]]:
+    # Best-fit designations across all competencies for each profile; skill names may be
+    # partial or misspelled. One vectorized pass over the skill index per top_k
+    index = get_competency_data(COMPETENCY_CSV).skill_index
+    results: List[List[Dict]] = [[] for _ in queries]
+    for top_k in {q.top_k for q in queries}:
+        positions = [i for i, q in enumerate(queries) if q.top_k == top_k]
+        for i, found in zip(positions, index.top_fits_many([queries[i].skill_ratings for i in positions], top_k)):
+            results[i] = found
+    return results
+
+
+@app.post("/assessment")
+async def assessment(request: AssessmentRequest):
+    # Off the event loop: a changed CSV rebuilds the skill graph on first use
+    skills_dict, certifications, career_step = await asyncio.to_thread(_validated, request)
+    result = assess_level(skills_dict, request.skill_ratings)
+    # Identical profiles in flight at the same time share one upstream LLM call
+    key = json.dumps(request.model_dump(), sort_keys=True)
+    verdict, recommendation = await assessments.do(
+        key, assess_and_recommend, request.designation, skills_dict, request.skill_ratings, certifications,
+        include_recommendation=request.include_recommendation, career_step=career_step, refresh=request.refresh,
+        competency=request.competency
+    )
+    return {**result, 'verdict': verdict, 'recommendation': recommendation, 'career_path': career_step}
+
+
+@app.post("/assessment/stream")
+async def assessment_stream(request: AssessmentRequest):
+    # Recommendation text only, streamed as the provider produces it; identical requests in
+    # flight share one upstream stream
+    skills_dict, certifications, career_step = await asyncio.to_thread(_validated, request)
+    key = "stream:" + json.dumps(request.model_dump(), sort_keys=True)
+    return StreamingResponse(
+        assessments.stream(key, stream_recommendation, request.designation, skills_dict, request.skill_ratings,
+                           certifications, career_step=career_step, refresh=request.refresh,
+                           competency=request.competency),
+        media_type="text/plain; charset=utf-8",
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host=os.getenv("API_HOST", "0.0.0.0"), port=int(os.getenv("API_PORT", "8000")))
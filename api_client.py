@@ -0,0 +1,73 @@
+import os
+import threading
+import time
+from typing import Dict, Iterator, List
+
+import httpx
+
+# How long competency lookups from the API are reused before asking again
+CACHE_TTL_SECONDS = float(os.getenv("ASSESSMENT_API_CACHE_TTL_SECONDS", "300"))
+
+
+class AssessmentClient:
+    """
+    Thin client for api.py with the CompetencyData getter interface, so app.py can use it
+    in place of the local data. One pooled keep-alive connection set per process.
+    """
+    def __init__(self, base_url: str, timeout: float = 120.0):
+        self._http = httpx.Client(base_url=base_url.rstrip("/"), timeout=timeout,
+                                  limits=httpx.Limits(max_connections=20, max_keepalive_connections=20))
+        self._cache: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, path: str, **params):
+        key = (path, tuple(sorted(params.items())))
+        now = time.monotonic()
+        with self._lock:
+            hit = self._cache.get(key)
+        if hit and hit[0] > now:
+            return hit[1]
+        response = self._http.get(path, params=params)
+        # Unknown competency/designation: behave like CompetencyData and return nothing
+        value = None if response.status_code == 404 else response.raise_for_status().json()
+        with self._lock:
+            self._cache[key] = (now + CACHE_TTL_SECONDS, value)
+        return value
+
+    def _profile(self, competency: str, designation: str) -> Dict:
+        return self._get("/skills", competency=competency, designation=designation) or {}
+
+    def get_competencies(self) -> List[str]:
+        return self._get("/competencies") or []
+
+    def get_designations(self, competency: str) -> List[str]:
+        return self._get("/designations", competency=competency) or []
+
+    def get_skills_for_designation(self, competency: str, designation: str) -> Dict[str, List[str]]:
+        return self._profile(competency, designation).get('skills', {})
+
+    def get_certifications_for_designation(self, competency: str, designation: str) -> List[str]:
+        return self._profile(competency, designation).get('certifications', [])
+
+    def top_fits(self, user_skill_ratings: Dict[str, str], top_k: int = 5) -> List[Dict]:
+        response = self._http.post("/fits", json=[{'skill_ratings': user_skill_ratings, 'top_k': top_k}])
+        return response.raise_for_status().json()[0]
+
+    def assess(self, competency: str, designation: str, user_skill_ratings: Dict[str, str],
+               include_recommendation: bool = True) -> Dict:
+        response = self._http.post("/assessment", json={
+            'competency': competency, 'designation': designation,
+            'skill_ratings': user_skill_ratings, 'include_recommendation': include_recommendation,
+        })
+        return response.raise_for_status().json()
+
+    def stream_recommendation(self, competency: str, designation: str,
+                              user_skill_ratings: Dict[str, str], refresh: bool = False) -> Iterator[str]:
+        with self._http.stream("POST", "/assessment/stream", json={
+            'competency': competency, 'designation': designation, 'skill_ratings': user_skill_ratings,
+            'refresh': refresh,
+        }) as response:
+            response.raise_for_status()
+            for text in response.iter_text():
+                if text:
+                    yield text
@@ -1,12 +1,79 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import os
 import streamlit as st
-from competency_data import CompetencyData
-from ai_utils import assess_and_recommend
+from assets import load_asset
+from level_assessment import PROFICIENCY_LABELS, format_verdict
+from telemetry import span
 
-# Load competency data
-competency_data = CompetencyData("competency-data.csv")
+# With ASSESSMENT_API_URL set, the app is a thin client of api.py and holds no LLM clients
+API_URL = os.getenv("ASSESSMENT_API_URL")
+if API_URL:
+    from api_client import AssessmentClient
+    from level_assessment import LevelAssessor
+
+    @st.cache_resource
+    def get_api_client(url):
+        return AssessmentClient(url)
+    competency_data = get_api_client(API_URL)
+
+    def assess_level(skills_dict, user_skill_ratings):
+        # Level scoring is cheap local arithmetic; only the recommendation needs the API
+        return LevelAssessor(skills_dict).assess(user_skill_ratings)
+else:
+    from competency_data import get_competency_data
+    from ai_utils import assess_level, stream_recommendation
+    # Shared, process-wide competency data; only re-parsed when the CSV changes
+    competency_data = get_competency_data("competency-data.csv")
+
+
+def recommendation_stream(competency, designation, skills_dict, user_skill_ratings, certifications, refresh=False):
+    if API_URL:
+        return competency_data.stream_recommendation(competency, designation, user_skill_ratings, refresh=refresh)
+    return stream_recommendation(
+        designation=designation,
+        skills_dict=skills_dict,
+        user_skill_ratings=user_skill_ratings,
+        certifications=certifications,
+        # Next designation and what it adds, worked out from the framework rather than by the LLM
+        career_step=competency_data.skill_graph.path(competency, designation, user_skill_ratings=user_skill_ratings),
+        refresh=refresh,
+        competency=competency
+    )
+
+def radar_chart(user_skill_ratings):
+    """
+    Radar chart of the ratings. The figure (layout, theta, styling) is built once per skill
+    list and kept in the session; later calls only replace the radial values.
+    """
+    categories = list(user_skill_ratings.keys())
+    values = [PROFICIENCY_LABELS.index(user_skill_ratings[cat]) + 1 for cat in categories]
+    cached = st.session_state.get('radar_chart')
+    if cached is None or cached[0] != categories:
+        # plotly is imported on the first chart, so the welcome page renders without it
+        import plotly.graph_objects as go
+        fig = go.Figure(
+            data=[
+                go.Scatterpolar(
+                    r=values + [values[0]],
+                    theta=categories + [categories[0]],
+                    fill='toself',
+                    name='Your Skill Profile',
+                    marker=dict(color='rgba(0,123,255,0.7)')
+                )
+            ]
+        )
+        fig.update_layout(
+            polar=dict(radialaxis=dict(visible=True, range=[1, 5])),
+            showlegend=False,
+            title="Your Skill Profile (Radar Chart)"
+        )
+        st.session_state['radar_chart'] = (categories, fig)
+        return fig
+    fig = cached[1]
+    fig.data[0].r = values + [values[0]]
+    return fig
 
 st.set_page_config(page_title="Career Growth Advisor", layout="wide", initial_sidebar_state="expanded")
 
@@ -47,7 +114,8 @@ with st.sidebar:
     # Add logo at the top of sidebar, centered
     col1, col2, col3 = st.columns([1, 4, 1])
     with col2:
-        st.image("logo.png", width=400, use_container_width=True)
+        # Pre-sized PNG bytes from memory; output_format="PNG" keeps st.image from re-encoding them
+        st.image(load_asset("logo"), width=400, use_container_width=True, output_format="PNG")
     st.header("Your Career Profile")
     
     # Step 1: User selects current competency in sidebar
@@ -176,7 +244,7 @@ if not (current_competency and current_designation):
             """, unsafe_allow_html=True)
             
             # Use Streamlit's native image component for better loading
-            st.image("welcome.png", width=700)
+            st.image(load_asset("welcome"), width=700, output_format="PNG")
             
             # Add the welcome text
             st.markdown("""
@@ -193,7 +261,7 @@ if current_competency and current_designation:
 # Step 3: Generate quiz with categorical levels for all skills from all levels
 user_skill_ratings = {}
 skill_levels = ['Skills: Novice', 'Skills: Basic', 'Skills: Intermediate', 'Skills: Advanced', 'Skills: Expert']
-proficiency_labels = ['Novice', 'Basic', 'Intermediate', 'Advanced', 'Expert']
+proficiency_labels = PROFICIENCY_LABELS
 
 # Only show quiz if both dropdowns have a selection and the designation is not empty
 if current_competency and current_designation:
@@ -202,47 +270,34 @@ if current_competency and current_designation:
     if any(skills_dict.values()):
         st.subheader("Select your proficiency level for each skill:")
         
-        # Create tabs for different skill levels
-        # First, get non-empty skill levels
-        available_levels = [level for level in skill_levels if skills_dict.get(level, [])]
-        
-        # Create tabs with formatted tab labels
-        tabs = st.tabs([level.replace('Skills: ', '') for level in available_levels])
-        
-        # Populate each tab with its skills
-        for i, level in enumerate(available_levels):
-            with tabs[i]:
-                skills = skills_dict.get(level, [])
-                if skills:
-                    for skill in skills:
-                        user_skill_ratings[skill] = st.radio(
-                            skill,
-                            proficiency_labels,
-                            horizontal=True,
-                            key=f"{level}_{skill}_{current_competency}_{current_designation}"
-                        )
+        # The quiz is a form: rating changes stay in the browser and the script reruns once on submit
+        with st.form(f"quiz_{current_competency}_{current_designation}", border=False):
+            # Create tabs for different skill levels
+            # First, get non-empty skill levels
+            available_levels = [level for level in skill_levels if skills_dict.get(level, [])]
+
+            # Create tabs with formatted tab labels
+            tabs = st.tabs([level.replace('Skills: ', '') for level in available_levels])
+
+            # Populate each tab with its skills
+            for i, level in enumerate(available_levels):
+                with tabs[i]:
+                    skills = skills_dict.get(level, [])
+                    if skills:
+                        for skill in skills:
+                            user_skill_ratings[skill] = st.radio(
+                                skill,
+                                proficiency_labels,
+                                horizontal=True,
+                                key=f"{level}_{skill}_{current_competency}_{current_designation}"
+                            )
+            if st.form_submit_button("Get Assessment"):
+                st.session_state['assessed'] = True
+
         # Radar chart visualization of skill ratings
-        import plotly.graph_objects as go
         if user_skill_ratings:
-            categories = list(user_skill_ratings.keys())
-            values = [proficiency_labels.index(user_skill_ratings[cat]) + 1 for cat in categories]
-            fig = go.Figure(
-                data=[
-                    go.Scatterpolar(
-                        r=values + [values[0]],
-                        theta=categories + [categories[0]],
-                        fill='toself',
-                        name='Your Skill Profile',
-                        marker=dict(color='rgba(0,123,255,0.7)')
-                    )
-                ]
-            )
-            fig.update_layout(
-                polar=dict(radialaxis=dict(visible=True, range=[1, 5])),
-                showlegend=False,
-                title="Your Skill Profile (Radar Chart)"
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            with span("app.radar_chart", skills=len(user_skill_ratings)):
+                st.plotly_chart(radar_chart(user_skill_ratings), use_container_width=True)
 
         # Track previous selection to reset results when changed
         if 'prev_competency' not in st.session_state:
@@ -250,63 +305,98 @@ if current_competency and current_designation:
         if 'prev_designation' not in st.session_state:
             st.session_state['prev_designation'] = current_designation
             
+        # Define a function to reset state
+        def reset_results():
+            for key in ('assessed', 'verdict', 'recommendation', 'recommendation_ratings', 'regenerate'):
+                if key in st.session_state:
+                    del st.session_state[key]
+
         # Reset results if competency or designation has changed
         if (st.session_state.get('prev_competency') != current_competency or 
             st.session_state.get('prev_designation') != current_designation):
-            if 'verdict' in st.session_state:
-                del st.session_state['verdict']
-            if 'recommendation' in st.session_state:
-                del st.session_state['recommendation']
+            reset_results()
             st.session_state['prev_competency'] = current_competency
             st.session_state['prev_designation'] = current_designation
         
-        # Define a function to reset state
-        def reset_results():
-            if 'verdict' in st.session_state:
-                del st.session_state['verdict']
-            if 'recommendation' in st.session_state:
-                del st.session_state['recommendation']
-        
         # Step 4: Assessment and Recommendation
-        col1, col2 = st.columns([3, 1])
-        with col1:
-            if st.button("Get Assessment & Career Path"):
-                with st.spinner("Assessing your level and generating recommendations..."):
-                    verdict, recommendation = assess_and_recommend(
-                        designation=current_designation,
-                        skills_dict=skills_dict,
-                        user_skill_ratings=user_skill_ratings,
-                        certifications=certifications
-                    )
-                # Store results in session state to persist after download
-                st.session_state['verdict'] = verdict
-                st.session_state['recommendation'] = recommendation
-                
-        with col2:
-            st.button("Reset Results", on_click=reset_results)
+        st.button("Reset Results", on_click=reset_results)
+
+        # The level is scored locally on every rerun, so it follows each submitted set of ratings
+        if st.session_state.get('assessed'):
+            assessment = assess_level(skills_dict, user_skill_ratings)
+            verdict = format_verdict(assessment)
+            st.session_state['verdict'] = verdict
+            ratings_key = tuple(sorted(user_skill_ratings.items()))
 
-        # Display results if present in session state
-        if 'verdict' in st.session_state and 'recommendation' in st.session_state:
             import re
             # Try to extract a concise heading from the verdict
             heading = None
             match = re.search(
                 r"((?:Based on (?:your|the) skill profile|Given this skill profile)[^\n\.!?]*[\.!?])",
-                st.session_state['verdict'], re.IGNORECASE)
+                verdict, re.IGNORECASE)
             if match:
                 heading = match.group(1).strip()
             else:
                 # Fallback: use the first line of the verdict
-                heading = st.session_state['verdict'].splitlines()[0].strip()
+                heading = verdict.splitlines()[0].strip()
             
-            st.markdown(f"{heading}")
-            st.markdown(f"**Career Path Recommendation:**\n{st.session_state['recommendation']}")
+            st.markdown(f"**{heading}**")
+            gaps = [g for g in assessment['gaps'] if g['gap'] > 0]
+            if gaps:
+                st.markdown(f"**Skill gaps for {assessment['next_level'] or 'Expert'}:**")
+                st.dataframe(
+                    [{'Skill': g['skill'], 'Your Rating': g['rated'], 'Expected': g['expected'], 'Gap': g['gap']}
+                     for g in gaps],
+                    use_container_width=True,
+                    hide_index=True
+                )
+
+            # Where the same ratings fit across every competency, from the inverted skill index
+            fits = competency_data.top_fits(user_skill_ratings, top_k=5)
+            if fits:
+                st.markdown("**Where you fit across the framework:**")
+                st.dataframe(
+                    [{'Designation': f['designation'], 'Competency': f['competency'], 'Level': f['level'],
+                      'Coverage': f"{f['coverage']:.0%}", 'Gaps': f['gaps']} for f in fits],
+                    use_container_width=True,
+                    hide_index=True
+                )
+
+            recommendation = None
+            if st.session_state.get('recommendation_ratings') == ratings_key:
+                recommendation = st.session_state.get('recommendation')
+
+            # The LLM only writes the narrative, and only on request. Common profiles are served
+            # from pre-generated recommendations; "Regenerate" asks the LLM for a fresh one
+            def request_regenerate():
+                # Button callbacks run before the script reruns, so the flag is set when generation is decided
+                st.session_state['regenerate'] = True
+
+            generate = st.button("Generate Career Path")
+            refresh = st.session_state.pop('regenerate', False)
+            if generate or refresh:
+                st.markdown("**Career Path Recommendation:**")
+                # Render tokens as they arrive instead of waiting for the full response
+                recommendation = st.write_stream(recommendation_stream(
+                    current_competency, current_designation, skills_dict, user_skill_ratings, certifications,
+                    refresh=refresh
+                ))
+                # Store results in session state to persist after download
+                st.session_state['recommendation'] = recommendation
+                st.session_state['recommendation_ratings'] = ratings_key
+            elif recommendation:
+                st.markdown(f"**Career Path Recommendation:**\n{recommendation}")
+            # Below the recommendation, so it shows in the same run that produced it
+            if recommendation:
+                st.button("Regenerate", on_click=request_regenerate)
             
-            st.markdown("</div>", unsafe_allow_html=True)
             import io
             report = io.StringIO()
-            report.write(f"Assessment: {st.session_state['verdict']}\n\n")
-            report.write(f"Career Path Recommendation:\n{st.session_state['recommendation']}\n")
+            report.write(f"Assessment: {verdict}\n\n")
+            for g in gaps:
+                report.write(f"- {g['skill']}: rated {g['rated']}, expected {g['expected']}\n")
+            if recommendation:
+                report.write(f"\nCareer Path Recommendation:\n{recommendation}\n")
             st.download_button(
                 label="Download This Career Path",
                 data=report.getvalue(),
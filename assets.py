@@ -0,0 +1,114 @@
+# Resized, compressed variants of the app's images, built once and served from memory.
+#
+#   python assets.py          # build (the Dockerfile runs this at image build time)
+#   python assets.py --force  # rebuild even if the cached variants exist
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import threading
+from typing import Dict
+
+# Source file and the CSS width it is displayed at in app.py
+ASSETS = {
+    "logo": {"source": "logo.png", "width": 400},
+    "welcome": {"source": "welcome.png", "width": 700},
+}
+ASSET_CACHE_DIR = os.getenv("ASSET_CACHE_DIR", ".asset_cache")
+# Rendered pixels per CSS pixel; 2 gives sharper images on HiDPI screens at ~4x the bytes
+PIXEL_RATIO = float(os.getenv("ASSET_PIXEL_RATIO", "1"))
+
+_memory: Dict[str, bytes] = {}
+_lock = threading.Lock()
+
+
+def _manifest_path():
+    return os.path.join(ASSET_CACHE_DIR, "manifest.json")
+
+
+def _read_manifest() -> Dict:
+    try:
+        with open(_manifest_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write(path, data: bytes):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _source_hash(path: str, manifest: Dict) -> str:
+    # The manifest remembers each source's hash by (mtime, size), so unchanged sources are not re-read
+    stat = os.stat(path)
+    entry = manifest.get(path)
+    if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+        return entry["sha256"]
+    with open(path, "rb") as f:
+        sha256 = hashlib.sha256(f.read()).hexdigest()
+    manifest[path] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha256}
+    return sha256
+
+
+def _render(source: str, width: int) -> bytes:
+    from PIL import Image
+    with Image.open(source) as image:
+        image.load()
+    if image.width > width:
+        image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+    # Adaptive 256-colour palette: a fraction of the size of truecolour PNG at display size
+    if image.mode in ("RGBA", "LA"):
+        image = image.convert("RGBA").quantize(256, method=Image.Quantize.FASTOCTREE)
+    else:
+        image = image.convert("RGB").quantize(256)
+    out = io.BytesIO()
+    image.save(out, format="PNG", optimize=True)
+    return out.getvalue()
+
+
+def build_asset(name: str, force: bool = False, manifest: Dict = None) -> str:
+    """Returns the path of the asset's cached variant, rendering it if it is missing."""
+    spec = ASSETS[name]
+    save_manifest = manifest is None
+    manifest = _read_manifest() if manifest is None else manifest
+    width = round(spec["width"] * PIXEL_RATIO)
+    path = os.path.join(ASSET_CACHE_DIR, f"{name}-{_source_hash(spec['source'], manifest)[:16]}-{width}w.png")
+    if force or not os.path.exists(path):
+        os.makedirs(ASSET_CACHE_DIR, exist_ok=True)
+        _write(path, _render(spec["source"], width))
+    if save_manifest:
+        _write(_manifest_path(), json.dumps(manifest, indent=2).encode("utf-8"))
+    return path
+
+
+def load_asset(name: str) -> bytes:
+    """PNG bytes of the asset at its display size, built on first use and then held in memory."""
+    data = _memory.get(name)
+    if data is None:
+        with _lock:
+            data = _memory.get(name)
+            if data is None:
+                with open(build_asset(name), "rb") as f:
+                    data = _memory[name] = f.read()
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build resized, compressed image variants for app.py.")
+    parser.add_argument("--force", action="store_true", help="Re-render even if a cached variant exists")
+    args = parser.parse_args()
+    manifest = _read_manifest()
+    for name, spec in ASSETS.items():
+        path = build_asset(name, force=args.force, manifest=manifest)
+        print(f"✅ {spec['source']} ({os.path.getsize(spec['source']) / 1024:.0f} KB) -> "
+              f"{path} ({os.path.getsize(path) / 1024:.0f} KB)")
+    _write(_manifest_path(), json.dumps(manifest, indent=2).encode("utf-8"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/import_profile.py
+#
+# Import-time profile of the project's modules: each module is imported in a fresh
+# interpreter with `python -X importtime`, and the report lists its cumulative import time
+# and its heaviest direct imports.
+#
+#   python benchmarks/import_profile.py                          # rewrite benchmarks/import_profile.txt
+#   python benchmarks/import_profile.py ai_utils --top 15 --output -
+#
+# Modules whose dependencies are not installed are reported with the import error; generate
+# the checked-in report with requirements.txt installed, so every module is measured.
+
+import argparse
+import os
+import platform
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["telemetry", "catalog", "competency_data", "level_assessment", "prompt_builder", "skill_graph",
+           "skill_index", "llm_router", "response_cache", "context_retrieval", "pregenerate", "ai_utils",
+           "vector_store", "bulk_assess", "career_advisor", "api", "test_query"]
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def profile(module):
+    """(cumulative seconds, [(seconds, name) of direct imports], error) for one fresh import."""
+    env = {**os.environ, "PYTHONPATH": ROOT + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        error = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        return None, [], error[-1] if error else f"exit code {proc.returncode}"
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            entries.append((len(match.group(3)) // 2, int(match.group(2)) / 1e6, match.group(4)))
+    # importtime prints children before their parent; the module's subtree ends at its own line
+    for end in range(len(entries) - 1, -1, -1):
+        if entries[end][0] == 0 and entries[end][2] == module:
+            break
+    else:
+        return None, [], "module not found in -X importtime output"
+    start = end
+    while start > 0 and entries[start - 1][0] > 0:
+        start -= 1
+    children = sorted(((seconds, name) for depth, seconds, name in entries[start:end] if depth == 1), reverse=True)
+    return entries[end][1], children, None
+
+
+def report(modules, repeat, top):
+    lines = [f"# Import-time profile (python -X importtime, median of {repeat} fresh interpreters)",
+             f"# Python {platform.python_version()} on {platform.platform()}", ""]
+    for module in modules:
+        runs = [profile(module) for _ in range(repeat)]
+        ok = sorted((r for r in runs if r[0] is not None), key=lambda r: r[0])
+        if not ok:
+            lines.append(f"{module:<20} import failed: {runs[-1][2]}")
+            continue
+        cumulative, children, _ = ok[len(ok) // 2]
+        lines.append(f"{module:<20} {cumulative * 1000:9.1f} ms")
+        for seconds, name in children[:top]:
+            lines.append(f"    {name:<32} {seconds * 1000:9.1f} ms")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time profile of the project's modules.")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="Heaviest direct imports listed per module")
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "import_profile.txt"),
+                        help="Report file ('-' for stdout)")
+    args = parser.parse_args()
+    text = report(args.modules, args.repeat, args.top)
+    if args.output == "-":
+        print(text, end="")
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(text, end="")
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
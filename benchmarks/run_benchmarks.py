@@ -0,0 +1,305 @@
+# benchmarks/run_benchmarks.py
+#
+# Offline benchmark suite for the whole assessment path. The LLM, Azure client and
+# embedder are replaced by the stubs in benchmarks/stubs.py, and the competency
+# framework is synthetically scaled, so no network or API key is needed.
+#
+#   python benchmarks/run_benchmarks.py                              # all stages
+#   python benchmarks/run_benchmarks.py --stages competency assessment
+#   python benchmarks/run_benchmarks.py --baseline benchmarks/results/main.json --max-regression 0.25
+#
+# Results are written as JSON (--output). With --baseline, the run fails (exit code 1)
+# when a stage's median is slower than the baseline by more than --max-regression.
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+STAGE_GROUPS = ["competency", "assessment", "vector_store", "app", "imports"]
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "median_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))] * 1000,
+        "runs": len(ordered),
+    }
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def make_framework(scale, tmp):
+    # Replicate every competency block `scale` times under suffixed names
+    import pandas as pd
+    df = pd.read_csv(os.path.join(ROOT, "competency-data.csv"))
+    if scale == 1:
+        parts = [df]
+    else:
+        parts = []
+        for k in range(scale):
+            part = df.copy()
+            named = part["Competency Name"].notna()
+            part.loc[named, "Competency Name"] = part.loc[named, "Competency Name"] + f" #{k}"
+            part["Designation Name"] = part["Designation Name"] + f" #{k}"
+            parts.append(part)
+    path = os.path.join(tmp, f"competency-x{scale}.csv")
+    pd.concat(parts).to_csv(path, index=False)
+    return path
+
+
+def bench_competency(args, tmp, results):
+    from catalog import compile_snapshot
+    from competency_data import CompetencyData
+    for scale in args.scales:
+        path = make_framework(scale, tmp)
+        repeat = max(1, args.repeat // max(1, scale // 10))
+        # Cold start (CSV parse and snapshot write) vs. warm start from the snapshot
+        results[f"competency_compile[x{scale}]"] = summarize(timed(lambda: compile_snapshot(path, "competencies"), repeat))
+        results[f"competency_load[x{scale}]"] = summarize(timed(lambda: CompetencyData(path), repeat))
+        data = CompetencyData(path)
+        pairs = [(c, d) for c in data.get_competencies() if c for d in data.get_designations(c)][:1000]
+
+        def lookups():
+            for c, d in pairs:
+                data.get_designations(c)
+                data.get_skills_for_designation(c, d)
+                data.get_certifications_for_designation(c, d)
+        samples = timed(lookups, args.repeat)
+        results[f"competency_lookup_per_designation[x{scale}]"] = summarize([s / len(pairs) for s in samples])
+
+        from skill_graph import SkillGraph
+        results[f"skill_graph_build[x{scale}]"] = summarize(timed(lambda: SkillGraph(data), repeat))
+        graph = SkillGraph(data)
+        queries = [{'competency': c, 'designation': d} for c, d in pairs]
+        samples = timed(lambda: graph.batch_paths(queries), args.repeat)
+        results[f"career_path_query[x{scale}]"] = summarize([s / len(queries) for s in samples])
+
+        from level_assessment import PROFICIENCY_LABELS
+        from skill_index import SkillIndex
+        results[f"skill_index_build[x{scale}]"] = summarize(timed(lambda: SkillIndex(data), repeat))
+        index = SkillIndex(data)
+        # One profile per designation: its own skills, rated across the proficiency range
+        profiles = [{skill: PROFICIENCY_LABELS[i % len(PROFICIENCY_LABELS)] for i, skill in enumerate(
+            s for skills in data.get_skills_for_designation(c, d).values() for s in skills)} for c, d in pairs]
+        samples = timed(lambda: [index.top_fits(p) for p in profiles], args.repeat)
+        results[f"top_fits_query[x{scale}]"] = summarize([s / len(profiles) for s in samples])
+        samples = timed(lambda: index.top_fits_many(profiles), args.repeat)
+        results[f"top_fits_bulk_per_profile[x{scale}]"] = summarize([s / len(profiles) for s in samples])
+
+
+def _sample_profile():
+    from competency_data import CompetencyData
+    from level_assessment import PROFICIENCY_LABELS
+    data = CompetencyData(os.path.join(ROOT, "competency-data.csv"))
+    competency, designation = "Java Engineering", "Java Developer"
+    skills_dict = data.get_skills_for_designation(competency, designation)
+    ratings = {skill: PROFICIENCY_LABELS[i % len(PROFICIENCY_LABELS)]
+               for i, skill in enumerate(s for skills in skills_dict.values() for s in skills)}
+    return designation, skills_dict, ratings, data.get_certifications_for_designation(competency, designation)
+
+
+def bench_assessment(args, tmp, results):
+    import ai_utils
+    from llm_router import LLMRouter, Provider, set_router
+    from stubs import StubAzureClient, StubLM
+
+    set_router(LLMRouter([Provider(
+        "stub",
+        lm=StubLM(latency=args.llm_latency, output_tokens=args.llm_tokens, tokens_per_second=args.llm_tps),
+        client=StubAzureClient(first_token_latency=args.llm_latency, output_tokens=args.llm_tokens,
+                               tokens_per_second=args.llm_tps),
+        stream_model="stub",
+    )]))
+    try:
+        from vector_store import DesignationVectorStore
+    except ImportError as e:
+        print(f"⚠️ Retrieval context not available, assessing without it: {e}")
+    else:
+        # Grounding context from a stub-embedded store over data.csv, precomputed like in production
+        from competency_data import CompetencyData
+        from context_retrieval import ContextRetriever, set_context_retriever
+        from stubs import StubEmbedder
+        store = DesignationVectorStore(os.path.join(tmp, "retrieval-store"), backend="numpy", embedder=StubEmbedder())
+        store.load_data(os.path.join(ROOT, "data.csv"))
+        retriever = ContextRetriever(store, descriptors_csv=os.path.join(ROOT, "data.csv"),
+                                     cache_path=os.path.join(tmp, "retrieved_context.json"))
+        retriever.precompute(CompetencyData(os.path.join(ROOT, "competency-data.csv")))
+        set_context_retriever(retriever)
+    designation, skills_dict, ratings, certifications = _sample_profile()
+
+    results["assess_level"] = summarize(timed(lambda: ai_utils.assess_level(skills_dict, ratings), args.repeat * 20))
+    results["assess_and_recommend[uncached]"] = summarize(timed(
+        lambda: ai_utils.assess_and_recommend(designation, skills_dict, ratings, certifications, use_cache=False),
+        args.repeat))
+    ai_utils.assess_and_recommend(designation, skills_dict, ratings, certifications)
+    results["assess_and_recommend[cached]"] = summarize(timed(
+        lambda: ai_utils.assess_and_recommend(designation, skills_dict, ratings, certifications), args.repeat * 20))
+
+    first, total = [], []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        stream = ai_utils.stream_recommendation(designation, skills_dict, ratings, certifications, use_cache=False)
+        next(stream)
+        first.append(time.perf_counter() - start)
+        for _ in stream:
+            pass
+        total.append(time.perf_counter() - start)
+    results["stream_recommendation[first_token]"] = summarize(first)
+    results["stream_recommendation[total]"] = summarize(total)
+
+
+def bench_vector_store(args, tmp, results):
+    from stubs import StubEmbedder
+    from vector_store import DesignationVectorStore
+
+    embedder = StubEmbedder()
+    data_file = os.path.join(ROOT, "data.csv")
+    load_samples = []
+    for i in range(args.repeat):
+        store = DesignationVectorStore(os.path.join(tmp, f"store-{i}"), backend=args.vector_backend, embedder=embedder)
+        start = time.perf_counter()
+        store.load_data(data_file)
+        load_samples.append(time.perf_counter() - start)
+    results[f"vector_load_data[{args.vector_backend}]"] = summarize(load_samples)
+
+    counter = iter(range(10 ** 9))
+    results[f"vector_query[{args.vector_backend},uncached]"] = summarize(timed(
+        lambda: store.query(f"python developer {next(counter)}"), args.repeat * 10))
+    store.query("python developer")
+    results[f"vector_query[{args.vector_backend},cached]"] = summarize(timed(
+        lambda: store.query("python developer"), args.repeat * 10))
+
+
+def bench_app(args, tmp, results):
+    from streamlit.testing.v1 import AppTest
+
+    os.chdir(ROOT)
+    app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+    start = time.perf_counter()
+    app.run()
+    results["app_first_run"] = summarize([time.perf_counter() - start])
+
+    app.sidebar.selectbox[0].select("Java Engineering").run()
+    app.sidebar.selectbox[1].select("Java Developer").run()
+    labels = ["Novice", "Basic", "Intermediate", "Advanced", "Expert"]
+
+    # One completed assessment: rate every skill, then submit the quiz form. Radios inside the
+    # form do not rerun the script, so this is a single rerun however many skills there are
+    # (it used to be one full rerun per rated skill).
+    wall, cpu = [], []
+    for k in range(args.repeat * 2):
+        for i, radio in enumerate(app.radio):
+            radio.set_value(labels[(i + k) % len(labels)])
+        submit = next(b for b in app.button if b.label == "Get Assessment")
+        start, start_cpu = time.perf_counter(), time.process_time()
+        submit.click().run()
+        wall.append(time.perf_counter() - start)
+        cpu.append(time.process_time() - start_cpu)
+    results[f"app_complete_assessment[{len(app.radio)} skills]"] = summarize(wall)
+    results[f"app_complete_assessment[{len(app.radio)} skills,cpu]"] = summarize(cpu)
+
+
+def bench_imports(args, tmp, results):
+    # Cold import of the entry-point modules, each in a fresh interpreter (see import_profile.py)
+    from import_profile import profile
+    for module in ["competency_data", "ai_utils", "vector_store", "career_advisor", "api"]:
+        runs = [profile(module) for _ in range(args.repeat)]
+        samples = [cumulative for cumulative, _, _ in runs if cumulative is not None]
+        if not samples:
+            print(f"⚠️ import[{module}] skipped: {runs[-1][2]}")
+            continue
+        results[f"import[{module}]"] = summarize(samples)
+
+
+def compare(results, baseline, max_regression, min_delta_ms):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("stages", {}).get(name)
+        if previous and previous["median_ms"] > 0:
+            change = current["median_ms"] / previous["median_ms"] - 1
+            # Sub-microsecond stages are noisy; ignore changes below min_delta_ms
+            if change > max_regression and current["median_ms"] - previous["median_ms"] > min_delta_ms:
+                regressions.append(f"{name}: {previous['median_ms']:.3f} ms -> {current['median_ms']:.3f} ms "
+                                   f"(+{change:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite with a stub LLM.")
+    parser.add_argument("--stages", nargs="+", default=STAGE_GROUPS, choices=STAGE_GROUPS)
+    parser.add_argument("--scales", nargs="+", type=int, default=[1, 10, 100, 1000],
+                        help="Synthetic framework sizes as multiples of competency-data.csv")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Stub LLM latency before output (s)")
+    parser.add_argument("--llm-tokens", type=int, default=200, help="Stub LLM output tokens")
+    parser.add_argument("--llm-tps", type=float, default=500.0, help="Stub LLM output tokens per second")
+    parser.add_argument("--vector-backend", default="numpy", choices=["chroma", "numpy"])
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results", "latest.json"))
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Allowed slowdown of a stage's median vs. the baseline (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="Slowdowns smaller than this many milliseconds never count as regressions")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep every side effect (response cache, stores) inside the temp dir and out of the network
+        os.environ["ASSESSMENT_CACHE_PATH"] = os.path.join(tmp, "assessment_cache.sqlite3")
+        os.environ["CATALOG_DIR"] = os.path.join(tmp, "catalog")
+        for name, value in [("AZURE_OPENAI_ENDPOINT", "https://stub.invalid"), ("AZURE_OPENAI_KEY", "stub"),
+                            ("AZURE_OPENAI_API_VERSION", "2024-02-15-preview"),
+                            ("AZURE_OPENAI_MODEL_NAME", "azure/stub"), ("AZURE_OPENAI_DEPLOYMENT_NAME", "stub")]:
+            os.environ.setdefault(name, value)
+
+        results = {}
+        benches = {"competency": bench_competency, "assessment": bench_assessment,
+                   "vector_store": bench_vector_store, "app": bench_app, "imports": bench_imports}
+        for group in args.stages:
+            start = time.perf_counter()
+            benches[group](args, tmp, results)
+            print(f"[{group}] done in {time.perf_counter() - start:.1f}s")
+
+    print(f"\n{'stage':<52}{'median ms':>12}{'p95 ms':>12}")
+    for name, stats in results.items():
+        print(f"{name:<52}{stats['median_ms']:>12.3f}{stats['p95_ms']:>12.3f}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+            "stages": results,
+        }, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression, args.min_delta_ms)
+        if regressions:
+            print("\n❌ Regressions beyond the allowed threshold:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("✅ No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
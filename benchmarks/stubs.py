@@ -0,0 +1,94 @@
+# benchmarks/stubs.py
+#
+# Offline stand-ins for the LLM, the Azure OpenAI client and the sentence embedder,
+# with configurable latency and output size, so the benchmarks never touch the network.
+
+import hashlib
+import re
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+
+def _words(count):
+    return " ".join(f"token{i % 97}" for i in range(count))
+
+
+class StubLM:
+    """
+    Callable with the dspy LM calling convention (prompt or messages in, list of strings
+    out). Sleeps latency + output tokens / tokens_per_second per call, where the output is
+    output_tokens long unless a max_tokens kwarg caps it. For dspy.Predict
+    calls it answers every field listed under "Your output fields are:" in ChatAdapter format.
+    """
+    def __init__(self, latency=0.5, output_tokens=300, tokens_per_second=100.0, model="stub/llm"):
+        self.latency = latency
+        self.output_tokens = output_tokens
+        self.tokens_per_second = tokens_per_second
+        self.model = model
+        self.kwargs = {"temperature": 0.0, "max_tokens": output_tokens}
+        self.history = []
+        self.calls = 0
+
+    def __call__(self, prompt=None, messages=None, **kwargs):
+        self.calls += 1
+        # Like a real model, a max_tokens cap ends the output early
+        tokens = min(self.output_tokens, kwargs.get("max_tokens") or self.output_tokens)
+        time.sleep(self.latency + tokens / self.tokens_per_second)
+        text = _words(tokens)
+        system = (messages or [{}])[0].get("content", "") if messages else ""
+        if "Your output fields are:" in system:
+            section = system.split("Your output fields are:", 1)[1].split("All interactions", 1)[0]
+            fields = re.findall(r"`(\w+)`", section)
+            text = "\n\n".join(f"[[ ## {field} ## ]]\n{text}" for field in fields) + "\n\n[[ ## completed ## ]]"
+        return [text]
+
+    def copy(self, **kwargs):
+        return self
+
+
+class StubAzureClient:
+    """Just enough of AzureOpenAI for chat.completions.create(stream=True)."""
+    def __init__(self, first_token_latency=0.3, output_tokens=300, tokens_per_second=100.0):
+        self.first_token_latency = first_token_latency
+        self.output_tokens = output_tokens
+        self.tokens_per_second = tokens_per_second
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model=None, messages=None, stream=False, max_tokens=None, **kwargs):
+        tokens = [f"token{i % 97} " for i in range(min(self.output_tokens, max_tokens or self.output_tokens))]
+
+        def chunk(text):
+            return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+        def generate():
+            time.sleep(self.first_token_latency)
+            for token in tokens:
+                time.sleep(1 / self.tokens_per_second)
+                yield chunk(token)
+
+        if stream:
+            return generate()
+        time.sleep(self.first_token_latency + len(tokens) / self.tokens_per_second)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="".join(tokens)))])
+
+
+class StubEmbedder:
+    """Deterministic hash-seeded unit vectors in place of SentenceTransformer.encode."""
+    def __init__(self, dim=384, seconds_per_text=0.0):
+        self.dim = dim
+        self.seconds_per_text = seconds_per_text
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        if self.seconds_per_text:
+            time.sleep(self.seconds_per_text * len(texts))
+        vectors = np.stack([
+            np.random.default_rng(int.from_bytes(hashlib.sha256(t.encode("utf-8")).digest()[:8], "little"))
+            .standard_normal(self.dim).astype(np.float32)
+            for t in texts
+        ]) if texts else np.zeros((0, self.dim), dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors[0] if single else vectors
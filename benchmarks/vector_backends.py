@@ -0,0 +1,165 @@
+# benchmarks/vector_backends.py
+#
+# Compare the Chroma and NumPy vector store backends on query latency, recall@k
+# against exact float32 search, and resident memory.
+#
+#   python benchmarks/vector_backends.py                    # data.csv + data.json, real embeddings
+#   python benchmarks/vector_backends.py --synthetic 5000   # random unit vectors, no model needed
+#
+# Each backend runs in its own process so its resident memory is measured in isolation.
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BACKENDS = ["chroma", "numpy", "numpy-float16", "numpy-int8"]
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def build_corpus(args):
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((args.synthetic, args.dim)).astype(np.float32)
+        queries = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+        designations = [f"Designation {i % 50}" for i in range(args.synthetic)]
+        documents = [f"doc {i}" for i in range(args.synthetic)]
+    else:
+        from sentence_transformers import SentenceTransformer
+        from vector_store import EMBEDDING_MODEL, _iter_records
+        designations, documents = [], []
+        for file_path in ("data.csv", "data.json"):
+            for names, skills in _iter_records(os.path.join(ROOT, file_path), 1000):
+                designations += names
+                documents += [f"Designation: {d}\nSkills: {s}" for d, s in zip(names, skills)]
+        model = SentenceTransformer(EMBEDDING_MODEL)
+        vectors = model.encode(documents, convert_to_numpy=True).astype(np.float32)
+        # Queries: the designation names themselves, cycled up to --queries
+        queries = model.encode([designations[i % len(designations)] for i in range(args.queries)],
+                               convert_to_numpy=True).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return vectors, queries, designations, documents
+
+
+def open_collection(backend, path):
+    if backend == "chroma":
+        import chromadb
+        client = chromadb.PersistentClient(path=path)
+        return client, client.get_or_create_collection(name="bench")
+    from numpy_index import NumpyCollection
+    quantization = backend.split("-")[1] if "-" in backend else None
+    return None, NumpyCollection(os.path.join(path, "numpy_index"), quantization=quantization)
+
+
+def run_backend(backend, corpus_file, top_k, out):
+    # Child process: build the index, reopen it from disk and time single queries
+    data = np.load(corpus_file, allow_pickle=True)
+    vectors, queries = data["vectors"], data["queries"]
+    documents, designations = list(data["documents"]), list(data["designations"])
+    with tempfile.TemporaryDirectory() as path:
+        client, collection = open_collection(backend, path)
+        ids = [f"doc_{i}" for i in range(len(vectors))]
+        step = getattr(client, "get_max_batch_size", lambda: 5000)() if client else len(ids)
+        start = time.perf_counter()
+        for offset in range(0, len(ids), step):
+            collection.upsert(
+                ids=ids[offset:offset + step],
+                documents=documents[offset:offset + step],
+                embeddings=vectors[offset:offset + step].tolist(),
+                metadatas=[{"designation": d} for d in designations[offset:offset + step]],
+            )
+        build_seconds = time.perf_counter() - start
+        del client, collection
+
+        before = rss_mb()
+        _, collection = open_collection(backend, path)
+        collection.query(query_embeddings=[queries[0].tolist()], n_results=top_k)  # warm-up
+        latencies, found = [], []
+        for q in queries:
+            start = time.perf_counter()
+            result = collection.query(query_embeddings=[q.tolist()], n_results=top_k)
+            latencies.append(time.perf_counter() - start)
+            found.append([int(i.split("_")[1]) for i in result["ids"][0]])
+        out.put({
+            "backend": backend,
+            "build_seconds": build_seconds,
+            "rss_mb": rss_mb() - before,
+            "p50_ms": float(np.percentile(latencies, 50) * 1000),
+            "p95_ms": float(np.percentile(latencies, 95) * 1000),
+            "found": found,
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chroma vs NumPy vector backend benchmark.")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N random vectors instead of the data files")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    vectors, queries, designations, documents = build_corpus(args)
+    # Ground truth: exact float32 cosine top-k
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.top_k]
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_file = os.path.join(tmp, "corpus.npz")
+        np.savez(corpus_file, vectors=vectors, queries=queries,
+                 documents=np.array(documents, dtype=object), designations=np.array(designations, dtype=object))
+        for backend in args.backends:
+            out = ctx.Queue()
+            proc = ctx.Process(target=run_backend, args=(backend, corpus_file, args.top_k, out))
+            proc.start()
+            # Read before join: a result larger than the pipe buffer blocks the child until it is read
+            result = None
+            while result is None and (proc.is_alive() or not out.empty()):
+                try:
+                    result = out.get(timeout=1)
+                except queue.Empty:
+                    pass
+            proc.join()
+            if result is None:
+                print(f"{backend}: failed (exit code {proc.exitcode}), skipped")
+                continue
+            found = result.pop("found")
+            result["recall"] = float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth.tolist())]))
+            results.append(result)
+
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, top-{args.top_k}")
+    print(f"{'backend':<15}{'build s':>10}{'p50 ms':>10}{'p95 ms':>10}{'recall':>10}{'RSS MB':>10}")
+    for r in results:
+        print(f"{r['backend']:<15}{r['build_seconds']:>10.2f}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}"
+              f"{r['recall']:>10.3f}{r['rss_mb']:>10.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"vectors": len(vectors), "queries": len(queries), "top_k": args.top_k, "results": results},
+                      f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+# bulk_assess.py
+#
+# Run assessments for a whole roster of employees.
+#
+#   python bulk_assess.py roster.csv results.jsonl --concurrency 8 --tokens-per-minute 60000
+#   python bulk_assess.py roster.csv mobility.jsonl --no-recommendation --fits 5   # internal-mobility matches
+#
+# The roster is a CSV or JSONL file with competency, designation and skill_ratings
+# ({"skill": "Intermediate", ...}; a JSON string in CSV) plus an optional employee_id and
+# target designation (default: the next one on the competency's career ladder).
+# Results are appended to the JSONL output as they finish; rerunning with the same
+# output file skips employees that already have a result, successful or invalid. Rows
+# that cannot be parsed are reported as invalid and do not stop the run.
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Dict, List
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from ai_utils import assess_and_recommend, assess_level
+from context_retrieval import get_context_retriever
+from llm_router import is_retryable
+from prompt_builder import SYSTEM_PROMPT, build_prompt, count_tokens
+from competency_data import get_competency_data
+from level_assessment import PROFICIENCY_LABELS
+
+def _parse_line(line: str) -> Dict:
+    try:
+        row = json.loads(line)
+    except json.JSONDecodeError as e:
+        return {'parse_error': f"invalid JSON line: {e}"}
+    return row if isinstance(row, dict) else {'parse_error': "JSON line is not an object"}
+
+
+def read_roster(path: str) -> List[Dict]:
+    # Rows that cannot be parsed are kept with a parse_error, which validate_row reports
+    if path.endswith('.jsonl'):
+        with open(path, encoding='utf-8') as f:
+            rows = [_parse_line(line) for line in f if line.strip()]
+    else:
+        import pandas as pd
+        df = pd.read_csv(path, dtype=str).fillna('')
+        rows = df.to_dict(orient='records')
+    for i, row in enumerate(rows):
+        row['employee_id'] = str(row.get('employee_id') or row.get('id') or f"row-{i + 1}")
+        ratings = row.get('skill_ratings') or {}
+        if isinstance(ratings, str):
+            try:
+                ratings = json.loads(ratings)
+            except json.JSONDecodeError as e:
+                row.setdefault('parse_error', f"skill_ratings is not valid JSON: {e}")
+                ratings = {}
+        if not isinstance(ratings, dict):
+            row.setdefault('parse_error', "skill_ratings must be an object of skill -> rating")
+            ratings = {}
+        row['skill_ratings'] = ratings
+    return rows
+
+
+def validate_row(row: Dict, competency_data) -> List[str]:
+    if row.get('parse_error'):
+        return [row['parse_error']]
+    if not isinstance(row.get('skill_ratings'), dict):
+        return ["skill_ratings must be an object of skill -> rating"]
+    errors = []
+    competency, designation = row.get('competency', ''), row.get('designation', '')
+    if not isinstance(competency, str) or not isinstance(designation, str):
+        return ["competency and designation must be strings"]
+    if not isinstance(row.get('target') or '', str):
+        return ["target must be a designation name"]
+    if not competency_data.get_designations(competency):
+        return [f"unknown competency '{competency}'"]
+    skills_dict = competency_data.get_skills_for_designation(competency, designation)
+    if not skills_dict:
+        return [f"unknown designation '{designation}' for '{competency}'"]
+    known = {skill for skills in skills_dict.values() for skill in skills}
+    for skill, label in row['skill_ratings'].items():
+        if skill not in known:
+            errors.append(f"unknown skill '{skill}'")
+        elif label not in PROFICIENCY_LABELS:
+            errors.append(f"invalid rating '{label}' for '{skill}'")
+    return errors
+
+
+def load_done_ids(path: str) -> set:
+    done = set()
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Partial line from an interrupted run
+                # Invalid rows are not retried either; fixed rows go to a new output file
+                if result.get('status') in ('ok', 'invalid'):
+                    done.add(result.get('employee_id'))
+    return done
+
+
+class TokenRateLimiter:
+    """Token bucket refilled continuously at tokens_per_minute."""
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self, amount: int):
+        amount = min(float(amount), self.capacity)
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60)
+            self.updated = now
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) * 60 / self.capacity)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run(args):
+    competency_data = get_competency_data(args.competency_csv)
+    rows = read_roster(args.roster)
+    done = load_done_ids(args.output)
+    pending = [row for row in rows if row['employee_id'] not in done]
+    print(f"{len(rows)} employees in roster, {len(done)} already done, {len(pending)} to assess.")
+    # Internal-mobility matches for the whole roster in vectorized passes over the skill index
+    fits = {}
+    if args.fits:
+        fits = dict(zip((row['employee_id'] for row in pending), competency_data.skill_index.top_fits_many(
+            [row['skill_ratings'] for row in pending], args.fits)))
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limiter = TokenRateLimiter(args.tokens_per_minute) if args.tokens_per_minute else None
+    latencies = []
+    counts = {'ok': 0, 'invalid': 0, 'failed': 0}
+    out = open(args.output, 'a', encoding='utf-8')
+    if out.tell() > 0:
+        with open(args.output, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                out.write("\n")  # Terminate a partial line left by an interrupted run
+
+    def write(result: Dict):
+        counts[result['status']] += 1
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+
+    async def assess(row: Dict):
+        # Any error is recorded against its row; it must not cancel the rest of the run
+        base = {'employee_id': row['employee_id'], 'competency': row.get('competency', ''),
+                'designation': row.get('designation', '')}
+        try:
+            await assess_row(row, base)
+        except Exception as e:
+            write({**base, 'status': 'failed', 'error': f"{type(e).__name__}: {e}"})
+
+    async def assess_row(row: Dict, base: Dict):
+        errors = validate_row(row, competency_data)
+        if errors:
+            write({**base, 'status': 'invalid', 'error': '; '.join(errors)})
+            return
+        competency, designation = row['competency'], row['designation']
+        skills_dict = competency_data.get_skills_for_designation(competency, designation)
+        certifications = competency_data.get_certifications_for_designation(competency, designation)
+        assessment = assess_level(skills_dict, row['skill_ratings'])
+        career_step = competency_data.skill_graph.path(competency, designation, row.get('target') or None,
+                                                       row['skill_ratings'])
+        estimate = 0
+        if limiter is not None and not args.no_recommendation:
+            # Prompt tokens counted locally, with the retrieved context the request will carry, plus the expected output
+            retriever = get_context_retriever()
+            context = retriever.context_for(designation, skills_dict) if retriever is not None else ""
+            _, stats = build_prompt(designation, skills_dict, assessment, certifications, career_step=career_step,
+                                    context=context)
+            estimate = count_tokens(SYSTEM_PROMPT) + stats['prompt_tokens'] + args.expected_output_tokens
+        async with semaphore:
+            start = time.perf_counter()
+            for attempt in range(args.retries + 1):
+                # Every attempt is a new request to the provider, so each one is charged
+                if estimate:
+                    await limiter.acquire(estimate)
+                try:
+                    verdict, recommendation = await asyncio.to_thread(
+                        assess_and_recommend, designation, skills_dict, row['skill_ratings'], certifications,
+                        include_recommendation=not args.no_recommendation, career_step=career_step,
+                        competency=competency
+                    )
+                    break
+                except Exception as e:
+                    if attempt == args.retries or not is_retryable(e):
+                        write({**base, 'status': 'failed', 'error': f"{type(e).__name__}: {e}"})
+                        return
+                    # Exponential backoff with full jitter
+                    await asyncio.sleep(random.uniform(0, args.backoff * 2 ** attempt))
+            latency = time.perf_counter() - start
+        latencies.append(latency)
+        write({**base, 'status': 'ok', 'level': assessment['level'], 'verdict': verdict,
+               'recommendation': recommendation, 'career_path': career_step,
+               **({'fits': fits[row['employee_id']]} if args.fits else {}), 'latency_s': round(latency, 4)})
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(assess(row) for row in pending))
+    finally:
+        out.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ {counts['ok']} assessed, {counts['invalid']} invalid, {counts['failed']} failed "
+          f"in {elapsed:.1f}s ({len(pending) / elapsed if elapsed else 0:.2f} employees/s).")
+    print(f"Latency p50 {percentile(latencies, 50):.3f}s, p95 {percentile(latencies, 95):.3f}s.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk career assessments for an employee roster.")
+    parser.add_argument("roster", help="Roster file (.csv or .jsonl)")
+    parser.add_argument("output", help="JSONL results file; existing successful results are skipped")
+    parser.add_argument("--competency-csv", default="competency-data.csv")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tokens-per-minute", type=int, default=0, help="0 disables rate limiting")
+    parser.add_argument("--expected-output-tokens", type=int, default=800)
+    # The LLM router already retries (LLM_RETRIES) and fails over; these are extra attempts per row on top
+    parser.add_argument("--retries", type=int, default=0,
+                        help="Row-level retries after the router has given up (each one repeats its retries)")
+    parser.add_argument("--backoff", type=float, default=1.0, help="Base backoff in seconds")
+    parser.add_argument("--no-recommendation", action="store_true", help="Only compute levels locally")
+    parser.add_argument("--fits", type=int, default=0,
+                        help="Add the N best-fit designations across all competencies to each result")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,68 @@
+import asyncio
+import contextvars
+import functools
 import os
+from concurrent.futures import ThreadPoolExecutor
 import dspy
+from context_retrieval import get_context_retriever
+from llm_router import get_router
+from telemetry import span, traced
 
-# Step 1: Configure Azure OpenAI
-from openai import AzureOpenAI
-
-client = AzureOpenAI(
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-    api_key=os.getenv("AZURE_OPENAI_KEY"),
-    api_version="2024-02-15-preview"
-)
-
-dspy.configure(lm=(
-    dspy.LM(
-        model=os.getenv("AZURE_OPENAI_MODEL_NAME"),
-        api_key=os.getenv("AZURE_OPENAI_KEY"),
-        api_base=os.getenv("AZURE_OPENAI_ENDPOINT"),
-        api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
-        deployment_id=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),  # Replace with your actual deployment ID
-    )
-))
-
-# Step 2: Define Career Advisor Signature & Module
+# Seconds each LLM call in enhance_all / aenhance_all may take before its section is given up
+CALL_TIMEOUT = float(os.getenv("CAREER_ADVISOR_TIMEOUT_SECONDS", "60"))
+# Own pool rather than the loop's default executor, so asyncio.run does not wait for timed-out calls
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("CAREER_ADVISOR_MAX_WORKERS", "8")),
+                               thread_name_prefix="career-advisor")
+# Completion cap per call; the answers are short and grounded in the retrieved framework context
+MAX_TOKENS = int(os.getenv("CAREER_ADVISOR_MAX_TOKENS", "300"))
+
+# Define Career Advisor Signature & Module
 class CareerPathSignature(dspy.Signature):
     current_designation = dspy.InputField(desc="The employee's current job title")
     desired_designation = dspy.InputField(desc="The desired next job title")
     retrieved_skills = dspy.InputField(desc="Relevant skills and growth areas")
     career_suggestion = dspy.OutputField(desc="Suggested growth path to move from current to desired role")
 
+class CareerEnhancementSignature(dspy.Signature):
+    designation = dspy.InputField(desc="The employee's current job title")
+    base_metrics = dspy.InputField(desc="Base performance metrics for the designation")
+    base_activities = dspy.InputField(desc="Base developmental activities for the designation")
+    skills = dspy.InputField(desc="Relevant skills")
+    performance_metrics = dspy.OutputField(desc="2-3 bullet points of improved or more actionable performance metrics for career growth")
+    developmental_activities = dspy.OutputField(desc="2-3 bullet points of additional or more effective developmental activities for career growth")
+
+def _text(response):
+    # dspy LM calls return a list of completions
+    if isinstance(response, list):
+        return "\n".join(str(r) for r in response)
+    return response
+
 class CareerAdvisor(dspy.Module):
     def __init__(self):
         super().__init__()
         self.predict = dspy.Predict(CareerPathSignature)
+        self.predict_enhancements = dspy.Predict(CareerEnhancementSignature)
+
+    def _predict(self, predictor, **inputs):
+        # dspy.Predict uses the LM from dspy.context, so each router attempt runs on its provider's LM
+        def run(provider):
+            with dspy.context(lm=provider.lm):
+                return predictor(config={"max_tokens": MAX_TOKENS}, **inputs)
+        return get_router().call(run)
 
+    def _reference(self, designation, skills):
+        # Top framework descriptors for the designation, precomputed by context_retrieval ('' if unavailable)
+        retriever = get_context_retriever()
+        return retriever.context_for(designation, skills) if retriever is not None else ""
+
+    def _grounded(self, designation, skills):
+        reference = self._reference(designation, skills)
+        return f"{skills}\nFramework reference:\n{reference}" if reference else skills
+
+    @traced("career_advisor.forward")
     def forward(self, current_designation, desired_designation, retrieved_skills):
-        return self.predict(
+        return self._predict(
+            self.predict,
             current_designation=current_designation,
             retrieved_skills=retrieved_skills,
             desired_designation=desired_designation
@@ -42,17 +71,116 @@ class CareerAdvisor(dspy.Module):
     def enhance_performance_metrics(self, designation, base_metrics, skills):
         prompt = (
             f"Given the designation '{designation}', the following base performance metrics: '{base_metrics}', "
-            f"and these relevant skills: '{skills}', suggest improved or more actionable performance metrics for career growth. "
-            f"Respond in 2-3 bullet points."
+            f"and these relevant skills: '{self._grounded(designation, skills)}', suggest improved or more actionable "
+            f"performance metrics for career growth. Respond in 2-3 bullet points."
         )
-        # Use the globally configured LLM
-        return dspy.settings.lm(prompt)
+        with span("career_advisor.enhance_performance_metrics", prompt_chars=len(prompt)):
+            return get_router().complete(prompt, max_tokens=MAX_TOKENS)
 
     def enhance_developmental_activities(self, designation, base_activities, skills):
         prompt = (
             f"Given the designation '{designation}', the following base developmental activities: '{base_activities}', "
-            f"and these relevant skills: '{skills}', suggest additional or more effective developmental activities for career growth. "
-            f"Respond in 2-3 bullet points."
+            f"and these relevant skills: '{self._grounded(designation, skills)}', suggest additional or more effective "
+            f"developmental activities for career growth. Respond in 2-3 bullet points."
+        )
+        with span("career_advisor.enhance_developmental_activities", prompt_chars=len(prompt)):
+            return get_router().complete(prompt, max_tokens=MAX_TOKENS)
+
+    @traced("career_advisor.enhance_merged")
+    def enhance_merged(self, designation, base_metrics, base_activities, skills):
+        """Both enhancements from one structured LLM call."""
+        return self._predict(
+            self.predict_enhancements,
+            designation=designation,
+            base_metrics=base_metrics,
+            base_activities=base_activities,
+            skills=self._grounded(designation, skills)
         )
-        # Use the globally configured LLM
-        return dspy.settings.lm(prompt)
+
+    # Async variants: the blocking calls run in worker threads, so several can be awaited together.
+    # A timed-out call stops being awaited, but its thread finishes the request in the background.
+    async def _run(self, fn, *args, timeout=None):
+        timeout = CALL_TIMEOUT if timeout is None else timeout
+        # Copy the context like asyncio.to_thread, so dspy.context overrides reach the worker
+        call = functools.partial(contextvars.copy_context().run, fn, *args)
+        try:
+            return await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(_executor, call), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"{fn.__name__} gave no response within {timeout:g}s") from None
+
+    async def aforward(self, current_designation, desired_designation, retrieved_skills, timeout=None):
+        return await self._run(self.forward, current_designation, desired_designation, retrieved_skills,
+                               timeout=timeout)
+
+    async def aenhance_performance_metrics(self, designation, base_metrics, skills, timeout=None):
+        return await self._run(self.enhance_performance_metrics, designation, base_metrics, skills, timeout=timeout)
+
+    async def aenhance_developmental_activities(self, designation, base_activities, skills, timeout=None):
+        return await self._run(self.enhance_developmental_activities, designation, base_activities, skills,
+                               timeout=timeout)
+
+    async def aenhance_merged(self, designation, base_metrics, base_activities, skills, timeout=None):
+        return await self._run(self.enhance_merged, designation, base_metrics, base_activities, skills,
+                               timeout=timeout)
+
+    async def aenhance_all(
+        self,
+        designation,
+        base_metrics,
+        base_activities,
+        skills,
+        desired_designation=None,
+        retrieved_skills=None,
+        merged=False,
+        timeout=None
+    ):
+        """
+        Runs the enhancement calls (and forward, if desired_designation is given) concurrently.
+        Without retrieved_skills, forward gets skills plus the retrieved framework context.
+        With merged=True both enhancements come from a single structured call instead of two.
+        Returns {'career_suggestion', 'performance_metrics', 'developmental_activities', 'errors'};
+        a section whose call failed or timed out is None and its error is listed under 'errors'.
+        """
+        calls = {}
+        if desired_designation is not None:
+            calls['career_suggestion'] = self.aforward(
+                designation, desired_designation,
+                retrieved_skills if retrieved_skills is not None else self._grounded(designation, skills),
+                timeout=timeout
+            )
+        if merged:
+            calls['enhancements'] = self.aenhance_merged(designation, base_metrics, base_activities, skills,
+                                                         timeout=timeout)
+        else:
+            calls['performance_metrics'] = self.aenhance_performance_metrics(designation, base_metrics, skills,
+                                                                             timeout=timeout)
+            calls['developmental_activities'] = self.aenhance_developmental_activities(
+                designation, base_activities, skills, timeout=timeout
+            )
+        outcomes = await asyncio.gather(*calls.values(), return_exceptions=True)
+
+        report = {'career_suggestion': None, 'performance_metrics': None, 'developmental_activities': None,
+                  'errors': {}}
+        for name, outcome in zip(calls, outcomes):
+            sections = ['performance_metrics', 'developmental_activities'] if name == 'enhancements' else [name]
+            if isinstance(outcome, BaseException):
+                error = f"{type(outcome).__name__}: {outcome}"
+                for section in sections:
+                    report['errors'][section] = error
+            elif name == 'enhancements':
+                report['performance_metrics'] = outcome.performance_metrics
+                report['developmental_activities'] = outcome.developmental_activities
+            elif name == 'career_suggestion':
+                report['career_suggestion'] = outcome.career_suggestion
+            else:
+                report[name] = _text(outcome)
+        return report
+
+    @traced("career_advisor.enhance_all")
+    def enhance_all(self, designation, base_metrics, base_activities, skills, desired_designation=None,
+                    retrieved_skills=None, merged=False, timeout=None):
+        """Blocking wrapper around aenhance_all; from async code, await aenhance_all instead."""
+        return asyncio.run(self.aenhance_all(
+            designation, base_metrics, base_activities, skills, desired_designation=desired_designation,
+            retrieved_skills=retrieved_skills, merged=merged, timeout=timeout
+        ))
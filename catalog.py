@@ -0,0 +1,233 @@
+# Compiled snapshots of the competency framework (competency-data.csv) and the skills
+# catalog (data.csv), so processes start without pandas parsing.
+#
+#   python catalog.py                                 # compile both default files
+#   python catalog.py competency-data.csv data.csv    # compile specific files
+#
+# A snapshot is two pickles in one file: a small header (schema version, source hash and
+# stat stamp) followed by the compiled data. Loaders recompile when the header's schema
+# version or source hash no longer matches, and keep serving a stale snapshot if the
+# source cannot be compiled. Pickle rather than Arrow/Parquet (pyarrow is installed, see
+# requirements.txt) because the catalogs are a few KiB: importing pyarrow alone would cost
+# far more of the cold start than loading the pickles, which needs only the standard library.
+
+import hashlib
+import os
+import pickle
+import re
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+SCHEMA_VERSION = 2
+CATALOG_DIR = os.getenv("CATALOG_DIR", ".catalog_cache")
+
+SKILL_LEVELS = ['Skills: Novice', 'Skills: Basic', 'Skills: Intermediate', 'Skills: Advanced', 'Skills: Expert']
+# Skill text columns of data.csv, in proficiency order
+SKILL_COLUMNS = ["Basic", "Intermediate", "Competent", "Advanced", "Expert"]
+
+INHERIT_MARKER = "Same as above"
+# The certifications column lost its line breaks ("...or ITOracle Certified..."); entries are
+# split again where one of these leading words follows a non-space character other than "("
+CERT_LEADS = ("Oracle", "AWS", "Google", "Microsoft", "Certified", "TOGAF", "PCAP", "PCPP",
+              "Linux Foundation", "HashiCorp", "IBM")
+_CERT_SPLIT = re.compile(r"(?<=[^\s(])(?=(?:" + "|".join(re.escape(lead) for lead in CERT_LEADS) + r")\b)")
+
+_lock = threading.Lock()
+
+
+def split_certifications(cell: str, inherited: List[str]) -> List[str]:
+    cell = cell.strip()
+    certifications = []
+    if cell.startswith(INHERIT_MARKER):
+        certifications = list(inherited)
+        cell = cell[len(INHERIT_MARKER):]
+    for part in re.split(r"[+,]", cell):
+        certifications += [c.strip() for c in _CERT_SPLIT.split(part) if c.strip() and c.strip() != '-']
+    return list(dict.fromkeys(certifications))
+
+
+def compile_competencies(csv_path: str) -> Dict:
+    """
+    Validates competency-data.csv and resolves continuation rows and "Same as above"
+    certification inheritance. Only the first block of a competency counts, and the first
+    row of a (competency, designation) pair wins.
+    """
+    import pandas as pd
+    df = pd.read_csv(csv_path, dtype=str).fillna('')
+    missing = [c for c in ('Competency Name', 'Designation Name') if c not in df.columns]
+    if missing:
+        raise ValueError(f"{csv_path}: missing required column(s) {missing}")
+
+    warnings = []
+    designations: Dict[str, List[str]] = {}
+    profiles = []
+    seen_blocks, seen_keys = set(), set()
+    competency, skip_block, inherited = '', False, []
+    for row_number, row in enumerate(df.to_dict(orient='records'), start=2):
+        name = row['Competency Name'].strip()
+        if name:
+            # A new block; a repeated competency name is ignored, as in the original row scan
+            competency, skip_block, inherited = name, name in seen_blocks, []
+            if skip_block:
+                warnings.append(f"row {row_number}: competency '{name}' repeated, block ignored")
+            seen_blocks.add(name)
+        if not competency or skip_block:
+            continue
+        designation = row['Designation Name'].strip()
+        if not designation:
+            continue
+        cert_cell = row.get('Degrees & Certifications', '')
+        if cert_cell.strip().startswith(INHERIT_MARKER) and not inherited:
+            warnings.append(f"row {row_number}: '{INHERIT_MARKER}' with no designation above it in '{competency}'")
+        certifications = split_certifications(cert_cell, inherited)
+        inherited = certifications
+        designations.setdefault(competency, []).append(designation)
+        if (competency, designation) in seen_keys:
+            warnings.append(f"row {row_number}: duplicate designation '{designation}' in '{competency}' ignored")
+            continue
+        seen_keys.add((competency, designation))
+        skills = {}
+        for level in SKILL_LEVELS:
+            cell = row.get(level, '').strip()
+            skills[level] = [] if cell == '-' else [s.strip() for s in cell.split(',') if s.strip()]
+        profiles.append((competency, designation, row.get('Level', '').strip(), skills, certifications))
+
+    return {
+        # Includes '' when continuation rows exist; the app uses it as the "no selection" entry
+        'competencies': sorted(set(df['Competency Name'].str.strip())),
+        'designations': designations,
+        'profiles': profiles,
+        'warnings': warnings,
+    }
+
+
+def skill_texts(df, csv_path: str) -> Tuple[List[str], List[str]]:
+    """
+    Names and skill texts (one skill column per line) of a data.csv frame or chunk; the
+    vector store indexes the same texts when it streams the file.
+    """
+    import pandas as pd
+    if "Competency Name" not in df.columns:
+        raise ValueError(f"{csv_path}: missing required column 'Competency Name'")
+    skills = pd.Series('', index=df.index)
+    for col in SKILL_COLUMNS:
+        if col in df.columns:
+            skills = skills + ("\n" + df[col].astype(str)).where(df[col].notna(), '')
+    return df["Competency Name"].astype(str).tolist(), skills.str[1:].tolist()
+
+
+def compile_skills(csv_path: str) -> Dict:
+    """
+    data.csv as parallel lists of names and skill texts (one skill column per line), plus
+    each row's description, performance metrics and developmental activities.
+    """
+    import pandas as pd
+    df = pd.read_csv(csv_path)
+    designations, skills = skill_texts(df, csv_path)
+    def text(col):
+        return df[col].fillna('').astype(str).str.strip().tolist() if col in df.columns else [''] * len(df)
+    return {
+        'designations': designations,
+        'skills': skills,
+        'descriptions': text("Competency Description"),
+        'metrics': text("Performance Metrics"),
+        'activities': text("Developmental Activities"),
+        'warnings': [],
+    }
+
+
+COMPILERS = {"competencies": compile_competencies, "skills": compile_skills}
+
+
+def snapshot_path(source: str, kind: str) -> str:
+    key = hashlib.sha1(os.path.abspath(source).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(CATALOG_DIR, f"{os.path.basename(source)}-{kind}-{key}.snapshot")
+
+
+def _read_header(path: str) -> Optional[Dict]:
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+        return None
+
+
+def _read_data(path: str) -> Dict:
+    with open(path, "rb") as f:
+        pickle.load(f)
+        return pickle.load(f)
+
+
+def _sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def compile_snapshot(source: str, kind: str) -> Dict:
+    """Compiles source and writes its snapshot; returns the header plus 'data'."""
+    start = time.perf_counter()
+    stat = os.stat(source)
+    sha256 = _sha256(source)
+    data = COMPILERS[kind](source)
+    header = {
+        'schema_version': SCHEMA_VERSION,
+        'kind': kind,
+        'source': source,
+        'source_sha256': sha256,
+        'source_mtime_ns': stat.st_mtime_ns,
+        'source_size': stat.st_size,
+        'compiled_at': time.time(),
+        'compile_seconds': time.perf_counter() - start,
+    }
+    path = snapshot_path(source, kind)
+    try:
+        os.makedirs(CATALOG_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError as e:
+        # Read-only file systems still work, just without the snapshot
+        print(f"⚠️ Could not write catalog snapshot {path}: {e}")
+    for warning in data['warnings']:
+        print(f"⚠️ {source}: {warning}")
+    return {**header, 'data': data}
+
+
+def load_snapshot(source: str, kind: str) -> Dict:
+    """
+    Returns the compiled catalog for source ({'source_sha256', ..., 'data'}), from its
+    snapshot when the schema version and source match, otherwise by compiling it.
+    """
+    path = snapshot_path(source, kind)
+    header = _read_header(path)
+    if header is not None and header.get('schema_version') == SCHEMA_VERSION:
+        stat = os.stat(source)
+        fresh = (header['source_mtime_ns'], header['source_size']) == (stat.st_mtime_ns, stat.st_size)
+        # Touched but unchanged (e.g. a fresh checkout): the content hash decides
+        if fresh or header['source_sha256'] == _sha256(source):
+            return {**header, 'data': _read_data(path)}
+    with _lock:
+        try:
+            return compile_snapshot(source, kind)
+        except Exception as e:
+            if header is None or header.get('schema_version') != SCHEMA_VERSION:
+                raise
+            print(f"⚠️ Serving stale catalog snapshot of {source}, compile failed: {e}")
+            return {**header, 'data': _read_data(path)}
+
+
+def main():
+    sources = sys.argv[1:] or ["competency-data.csv", "data.csv"]
+    for source in sources:
+        kind = "competencies" if "competency" in os.path.basename(source) else "skills"
+        snapshot = compile_snapshot(source, kind)
+        print(f"✅ {source} -> {snapshot_path(source, kind)} ({kind}, schema v{SCHEMA_VERSION}, "
+              f"sha256 {snapshot['source_sha256'][:12]}, {snapshot['compile_seconds'] * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,62 +1,160 @@
-import pandas as pd
-from typing import List, Dict
+import os
+import threading
+import time
+from typing import List, Dict, Tuple, Optional
+from catalog import SKILL_LEVELS, load_snapshot, snapshot_path
+from telemetry import traced
+
 
 class CompetencyData:
-    def __init__(self, csv_path: str):
-        self.df = pd.read_csv(csv_path)
-        self.df.fillna('', inplace=True)
+    @traced("competency.load")
+    def __init__(self, csv_path: str, snapshot: Optional[Dict] = None):
+        # Loads the compiled catalog snapshot (compiling competency-data.csv only when it is stale)
+        self.snapshot = snapshot or load_snapshot(csv_path, "competencies")
+        self._build_index(self.snapshot['data'])
+        self._skill_graph = None
+        self._skill_index = None
+
+    def _build_index(self, catalog: Dict):
+        # All lookup tables are built once so the getters are plain dictionary lookups
+        self._competencies: List[str] = catalog['competencies']
+        self._designations: Dict[str, List[str]] = catalog['designations']
+        self._skills: Dict[Tuple[str, str], Dict[str, List[str]]] = {}
+        self._certifications: Dict[Tuple[str, str], List[str]] = {}
+        self._levels: Dict[Tuple[str, str], str] = {}
+        for competency, designation, level, skills, certifications in catalog['profiles']:
+            self._skills[(competency, designation)] = skills
+            self._certifications[(competency, designation)] = certifications
+            self._levels[(competency, designation)] = level
 
+    @traced("competency.get_competencies")
     def get_competencies(self) -> List[str]:
-        # Return unique, non-empty competencies
-        return sorted(self.df['Competency Name'].dropna().unique())
+        # Sorted unique competency names ('' included when the framework has continuation rows)
+        return list(self._competencies)
 
+    @traced("competency.get_designations")
     def get_designations(self, competency: str) -> List[str]:
-        # Return all designations for a given competency, including those with empty competency name (continuation rows)
-        # Find the first row with the given competency
-        idx = self.df[self.df['Competency Name'] == competency].index
-        if len(idx) == 0:
-            return []
-        start = idx[0]
-        # Collect rows until the next non-empty competency name or end of file
-        designations = []
-        for i in range(start, len(self.df)):
-            row = self.df.iloc[i]
-            if i != start and row['Competency Name'] and row['Competency Name'] != competency:
-                break
-            designation = row['Designation Name']
-            if designation and designation.strip():
-                designations.append(designation.strip())
-        return designations
+        # Return all designations for a given competency, including those on continuation rows
+        return list(self._designations.get(competency, []))
 
+    @traced("competency.get_skills_for_designation")
     def get_skills_for_designation(self, competency: str, designation: str) -> Dict[str, List[str]]:
-        # Find the first row for the competency
-        idx = self.df[self.df['Competency Name'] == competency].index
-        if len(idx) == 0:
+        skills = self._skills.get((competency, designation))
+        if skills is None:
             return {}
-        start = idx[0]
-        # Search for the row with the given designation within this competency block
-        for i in range(start, len(self.df)):
-            row = self.df.iloc[i]
-            if i != start and row['Competency Name'] and row['Competency Name'] != competency:
-                break
-            if row['Designation Name'] == designation:
-                skill_levels = ['Skills: Novice', 'Skills: Basic', 'Skills: Intermediate', 'Skills: Advanced', 'Skills: Expert']
-                skills = {}
-                for level in skill_levels:
-                    val = row.get(level, '')
-                    if isinstance(val, str) and val.strip() and val.strip() != '-':
-                        skills[level] = [s.strip() for s in val.split(',') if s.strip()]
-                    else:
-                        skills[level] = []
-                return skills
-        return {}
+        return {level: list(values) for level, values in skills.items()}
 
+    @traced("competency.get_certifications_for_designation")
     def get_certifications_for_designation(self, competency: str, designation: str) -> List[str]:
-        filtered = self.df[(self.df['Competency Name'] == competency) & (self.df['Designation Name'] == designation)]
-        if filtered.empty:
-            return []
-        val = filtered.iloc[0].get('Degrees & Certifications', '')
-        if isinstance(val, str) and val.strip():
-            # Split by common delimiters
-            return [s.strip() for s in val.replace('+', ',').replace('Same as above', '').split(',') if s.strip()]
-        return []
+        return list(self._certifications.get((competency, designation), []))
+
+    def get_level_for_designation(self, competency: str, designation: str) -> str:
+        # The framework's Level column (Entry, Mid, Senior, Expert); '' when unknown
+        return self._levels.get((competency, designation), '')
+
+    @property
+    def skill_graph(self):
+        # Built on first use and kept with this snapshot, so a reload rebuilds it too
+        if self._skill_graph is None:
+            from skill_graph import SkillGraph
+            self._skill_graph = SkillGraph(self)
+        return self._skill_graph
+
+    @property
+    def skill_index(self):
+        # Inverted skill index over every competency, built on first use like skill_graph
+        if self._skill_index is None:
+            from skill_index import SkillIndex
+            self._skill_index = SkillIndex(self)
+        return self._skill_index
+
+    def top_fits(self, user_skill_ratings: Dict[str, str], top_k: int = 5) -> List[Dict]:
+        # Best-fit designations across all competencies for a set of rated skills
+        return self.skill_index.top_fits(user_skill_ratings, top_k)
+
+
+class CompetencySnapshot:
+    """
+    Process-wide, reload-on-change holder for a CompetencyData instance.
+    The current instance is swapped in with a single reference assignment, so readers
+    always see either the old or the new fully built snapshot.
+    """
+    def __init__(self, csv_path: str):
+        self.csv_path = csv_path
+        self._lock = threading.Lock()
+        self._data: Optional[CompetencyData] = None
+        self._stamp = None
+        self._sha256 = None
+        self.load_seconds = 0.0
+        self.size_bytes = 0
+        self.loaded_at = None
+        self.reloads = 0
+
+    def get(self) -> CompetencyData:
+        stat = os.stat(self.csv_path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        data = self._data
+        if data is not None and stamp == self._stamp:
+            return data
+        with self._lock:
+            if self._data is not None and stamp == self._stamp:
+                return self._data
+            self._reload(stamp)
+            return self._data
+
+    def _reload(self, stamp):
+        start = time.perf_counter()
+        try:
+            snapshot = load_snapshot(self.csv_path, "competencies")
+            sha256 = snapshot['source_sha256']
+            if self._data is not None and sha256 == self._sha256:
+                # Touched but unchanged; keep the current snapshot
+                self._stamp = stamp
+                return
+            data = CompetencyData(self.csv_path, snapshot=snapshot)
+        except Exception as e:
+            if self._data is None:
+                raise
+            # A half-written file must not take the app down; keep serving the old snapshot
+            print(f"⚠️ Keeping previous competency snapshot, reload of {self.csv_path} failed: {e}")
+            self._stamp = stamp
+            return
+        try:
+            self.size_bytes = os.path.getsize(snapshot_path(self.csv_path, "competencies"))
+        except OSError:
+            self.size_bytes = 0  # Compiled in memory only (snapshot could not be written)
+        self.load_seconds = time.perf_counter() - start
+        self.loaded_at = time.time()
+        self.reloads += 1
+        self._sha256 = sha256
+        self._data = data
+        self._stamp = stamp
+        print(f"✅ Loaded competency snapshot {sha256[:12]} from {self.csv_path} "
+              f"in {self.load_seconds * 1000:.1f} ms ({self.size_bytes / 1024:.1f} KiB).")
+
+    def stats(self) -> Dict:
+        return {
+            'path': self.csv_path,
+            'sha256': self._sha256,
+            'load_seconds': self.load_seconds,
+            'size_bytes': self.size_bytes,
+            'loaded_at': self.loaded_at,
+            'reloads': self.reloads,
+        }
+
+
+_snapshots: Dict[str, CompetencySnapshot] = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_competency_snapshot(csv_path: str) -> CompetencySnapshot:
+    # One snapshot holder per file for the whole process, shared by every Streamlit session
+    key = os.path.abspath(csv_path)
+    with _snapshots_lock:
+        if key not in _snapshots:
+            _snapshots[key] = CompetencySnapshot(csv_path)
+        return _snapshots[key]
+
+
+def get_competency_data(csv_path: str) -> CompetencyData:
+    return get_competency_snapshot(csv_path).get()
@@ -0,0 +1,273 @@
+# context_retrieval.py
+#
+# Grounding context for the LLM: the descriptors of data.csv (performance metrics and
+# developmental activities per competency) most relevant to a designation, found with
+# DesignationVectorStore and trimmed to a small token budget.
+#
+#   python context_retrieval.py    # precompute for every designation in competency-data.csv
+#
+# Retrieval runs once per designation and is kept in a JSON file next to the vector store,
+# so requests only do a dictionary lookup. The file is discarded when data.csv, the vector
+# store's contents (e.g. after load_data.py), top-k or the token budget change. Without a
+# built, non-empty store there is no context: requests then never load chromadb or the
+# embedding model, and pick the store up once load_data.py has filled it.
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+from catalog import SKILL_LEVELS, load_snapshot
+from prompt_builder import count_tokens
+
+RETRIEVAL_ENABLED = os.getenv("RETRIEVAL_CONTEXT", "1").lower() not in ("0", "false", "no")
+DESCRIPTORS_CSV = os.getenv("DESCRIPTORS_CSV", "data.csv")
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "2"))
+# Upper bound for the context block; it is added on top of PROMPT_TOKEN_BUDGET
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RETRIEVAL_CONTEXT_TOKENS", "120"))
+RETRIEVAL_CACHE_PATH = os.getenv("RETRIEVAL_CACHE_PATH", os.path.join("chromadb_store", "retrieved_context.json"))
+
+
+def _skills_text(skills: Union[Dict[str, List[str]], str]) -> str:
+    # Same shape as the indexed documents: one line of skills per framework column
+    if isinstance(skills, dict):
+        return "\n".join(", ".join(skills[level]) for level in SKILL_LEVELS if skills.get(level))
+    return str(skills)
+
+
+def _trim(line: str, budget: int) -> str:
+    # Longest word prefix of line that fits in budget tokens
+    if count_tokens(line) <= budget:
+        return line
+    words = line.split()
+    lo, hi = 0, len(words)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(" ".join(words[:mid]) + " …") <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return " ".join(words[:lo]) + " …" if lo else ""
+
+
+class ContextRetriever:
+    """
+    Top-k data.csv descriptors per designation, rendered as one trimmed line each. A store
+    (DesignationVectorStore over data.csv) can be passed in; by default the persisted one is
+    opened on the first retrieval. Retrieval errors disable the retriever for the process
+    and requests continue without context.
+    """
+    def __init__(self, store=None, descriptors_csv: str = DESCRIPTORS_CSV, cache_path: str = RETRIEVAL_CACHE_PATH,
+                 top_k: int = RETRIEVAL_TOP_K, token_budget: int = CONTEXT_TOKEN_BUDGET):
+        self._store = store
+        self.descriptors_csv = descriptors_csv
+        self.cache_path = cache_path
+        self.top_k = top_k
+        self.token_budget = token_budget
+        self.failed = False
+        self._missing_reported = False
+        self._lock = threading.Lock()
+        # (stat signature, sha256, compiled catalog) of descriptors_csv, and (sha256, rows by content hash)
+        self._source = None
+        self._rows_by_hash = None
+        self._loaded: Optional[str] = None
+        self._contexts: Optional[Dict[str, Dict]] = None
+
+    @property
+    def store(self):
+        if self._store is None:
+            from vector_store import DesignationVectorStore
+            self._store = DesignationVectorStore()
+        return self._store
+
+    def _descriptors(self):
+        # Reloaded when data.csv changes on disk; a stat per call, as for the store's stamp
+        stat = os.stat(self.descriptors_csv)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        source = self._source
+        if source is None or source[0] != signature:
+            snapshot = load_snapshot(self.descriptors_csv, "skills")
+            source = self._source = (signature, snapshot['source_sha256'], snapshot['data'])
+        return source
+
+    @property
+    def fingerprint(self) -> str:
+        # Changes whenever the retrieved context could; part of the prompt fingerprint.
+        # data.csv and the store's stamp only touch the disk when their files have changed
+        _, source_sha, _ = self._descriptors()
+        return hashlib.sha256(
+            f"{source_sha}:{self.store.stamp()}:{self.top_k}:{self.token_budget}".encode("utf-8")
+        ).hexdigest()[:16]
+
+    def _load(self, fingerprint: str) -> Dict[str, Dict]:
+        # Called with self._lock held; contexts retrieved under another fingerprint are dropped
+        if self._loaded != fingerprint:
+            try:
+                with open(self.cache_path, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+            except (OSError, ValueError):
+                saved = {}
+            self._contexts = saved.get("contexts", {}) if saved.get("fingerprint") == fingerprint else {}
+            self._loaded = fingerprint
+        return self._contexts
+
+    def _save(self, fingerprint: str):
+        contexts = self._contexts
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            tmp = f"{self.cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"fingerprint": fingerprint, "contexts": contexts}, f, ensure_ascii=False)
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            print(f"⚠️ Could not write retrieval cache {self.cache_path}: {e}")
+
+    def _built(self) -> bool:
+        # False until load_data.py has built the store; checked on every call, it is only a stat
+        if self.store.exists():
+            return True
+        if not self._missing_reported:
+            self._missing_reported = True
+            print(f"⚠️ Retrieval context off: no vector store at {self.store.persist_dir} (run load_data.py).")
+        return False
+
+    def version(self) -> str:
+        # The fingerprint, or "off" without a built store or once retrieval has failed
+        # (requests then go without context)
+        if not self.failed and self._built():
+            try:
+                return self.fingerprint
+            except Exception as e:
+                self._disable(e)
+        return "off"
+
+    def _disable(self, error: Exception):
+        # No data.csv, vector store or embedder in this environment: recommend without grounding
+        self.failed = True
+        print(f"⚠️ Retrieval context disabled: {type(error).__name__}: {error}")
+
+    @staticmethod
+    def _key(designation: str, skills_text: str) -> str:
+        return hashlib.sha256(f"{designation}\n{skills_text}".encode("utf-8")).hexdigest()[:16]
+
+    def _render(self, catalog: Dict, rows: List[int]) -> str:
+        lines, used = [], 0
+        for row in rows:
+            line = _trim(f"- {catalog['designations'][row]}: metrics: {catalog['metrics'][row]}; "
+                         f"activities: {catalog['activities'][row]}", self.token_budget - used)
+            if not line:
+                break
+            lines.append(line)
+            used += count_tokens(line) + 1
+        return "\n".join(lines)
+
+    def _retrieve(self, queries: Dict[str, tuple]) -> Dict[str, Dict]:
+        # One batched vector query for every (designation, skills text) not cached yet; runs
+        # without self._lock, so a cold store or embedder does not hold up cached lookups
+        from vector_store import document_text
+        _, source_sha, catalog = self._descriptors()
+        if self._rows_by_hash is None or self._rows_by_hash[0] != source_sha:
+            rows_by_hash = {}
+            for row, (name, skill_text) in enumerate(zip(catalog['designations'], catalog['skills'])):
+                rows_by_hash.setdefault(hashlib.sha256(document_text(name, skill_text).encode("utf-8")).hexdigest(), row)
+            self._rows_by_hash = (source_sha, rows_by_hash)
+        rows_by_hash = self._rows_by_hash[1]
+        keys = list(queries)
+        results = self.store.query_many([document_text(*queries[key]) for key in keys], top_k=self.top_k)
+        found = {}
+        for key, result in zip(keys, results):
+            metadatas = (result.get("metadatas") or [[]])[0] or []
+            rows = [rows_by_hash[m["content_hash"]] for m in metadatas
+                    if m and m.get("content_hash") in rows_by_hash]
+            found[key] = {
+                "context": self._render(catalog, rows),
+                "sources": [catalog['designations'][row] for row in rows],
+            }
+        return found
+
+    def _store_contexts(self, fingerprint: str, found: Dict[str, Dict]):
+        # Empty contexts are kept too: the fingerprint covers the store, so reloading it retries them
+        with self._lock:
+            self._load(fingerprint).update(found)
+            if found:
+                self._save(fingerprint)
+
+    def context_for(self, designation: str, skills: Union[Dict[str, List[str]], str]) -> str:
+        """The trimmed descriptor lines for a designation ('' if retrieval is unavailable)."""
+        if self.failed or not self._built():
+            return ""
+        skills_text = _skills_text(skills)
+        key = self._key(designation, skills_text)
+        try:
+            fingerprint = self.fingerprint
+            with self._lock:
+                cached = self._load(fingerprint).get(key)
+            if cached is not None:
+                return cached["context"]
+            if self.store.stamp().startswith("0:"):
+                # An empty store retrieves nothing; skip loading the embedding model for it
+                return ""
+            found = self._retrieve({key: (designation, skills_text)})
+            self._store_contexts(fingerprint, found)
+            return found[key]["context"]
+        except Exception as e:
+            self._disable(e)
+            return ""
+
+    def precompute(self, competency_data) -> Tuple[int, int]:
+        """
+        Retrieves context for every designation of the framework not cached yet; returns
+        (new, empty) counts, empty being designations the store returned nothing for.
+        """
+        fingerprint = self.fingerprint
+        queries = {}
+        with self._lock:
+            contexts = self._load(fingerprint)
+            for competency in competency_data.get_competencies():
+                for designation in competency_data.get_designations(competency) if competency else []:
+                    skills_text = _skills_text(competency_data.get_skills_for_designation(competency, designation))
+                    key = self._key(designation, skills_text)
+                    if not contexts.get(key, {}).get("context"):
+                        queries[key] = (designation, skills_text)
+        found = self._retrieve(queries) if queries else {}
+        self._store_contexts(fingerprint, found)
+        return len(found), sum(1 for value in found.values() if not value["context"])
+
+
+_retriever: Optional[ContextRetriever] = None
+_retriever_lock = threading.Lock()
+
+
+def get_context_retriever() -> Optional[ContextRetriever]:
+    # None when RETRIEVAL_CONTEXT is off
+    global _retriever
+    with _retriever_lock:
+        if _retriever is None and RETRIEVAL_ENABLED:
+            _retriever = ContextRetriever()
+        return _retriever
+
+
+def set_context_retriever(retriever: Optional[ContextRetriever]):
+    # Replace the process-wide retriever (benchmarks, tests)
+    global _retriever
+    with _retriever_lock:
+        _retriever = retriever
+
+
+def main():
+    from competency_data import CompetencyData
+    retriever = ContextRetriever()
+    start = time.perf_counter()
+    added, empty = retriever.precompute(CompetencyData(os.getenv("COMPETENCY_CSV", "competency-data.csv")))
+    print(f"✅ Retrieved context for {added - empty} new designation(s) in {time.perf_counter() - start:.2f}s "
+          f"({sum(1 for value in retriever._contexts.values() if value['context'])} cached in {retriever.cache_path}).")
+    if empty:
+        # e.g. a store built before documents carried content hashes: rebuild it with load_data.py
+        print(f"⚠️ No descriptors found for {empty} designation(s); is the vector store loaded from "
+              f"{retriever.descriptors_csv}?")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import numpy as np
+from typing import Dict, List, Sequence
+from competency_data import SKILL_LEVELS
+
+LEVELS = ['Entry', 'Mid', 'Senior', 'Expert']
+PROFICIENCY_LABELS = [level.replace('Skills: ', '') for level in SKILL_LEVELS]
+
+# Highest proficiency expected at each career level (Entry -> Basic ... Expert -> Expert)
+LEVEL_CAPS = np.array([2, 3, 4, 5], dtype=np.float32)
+# Share of a level's skill expectations a user must meet to be placed at that level
+PASS_THRESHOLD = 0.8
+
+
+class LevelAssessor:
+    """
+    Deterministic Entry/Mid/Senior/Expert scoring for one designation.
+    Each skill's required proficiency is the framework column it is listed under; a career
+    level expects every skill up to min(required, level cap), and its score is the share of
+    skills rated at or above that expectation. Scores are computed as one
+    NumPy expression, so a whole population can be scored in a single call.
+    """
+    def __init__(self, skills_dict: Dict[str, List[str]]):
+        self.skills = []
+        required = []
+        for rank, level in enumerate(SKILL_LEVELS, start=1):
+            for skill in skills_dict.get(level, []):
+                if skill not in self.skills:
+                    self.skills.append(skill)
+                    required.append(rank)
+        self.required = np.array(required, dtype=np.float32)
+        # targets[L, i]: proficiency career level L expects for skill i
+        self.targets = np.minimum(self.required[None, :], LEVEL_CAPS[:, None])
+        self._index = {skill: i for i, skill in enumerate(self.skills)}
+
+    def encode(self, ratings_list: Sequence[Dict[str, str]]) -> np.ndarray:
+        # Ratings as a (profiles x skills) matrix of 1..5; unrated skills count as 0
+        matrix = np.zeros((len(ratings_list), len(self.skills)), dtype=np.float32)
+        ranks = {label: i + 1 for i, label in enumerate(PROFICIENCY_LABELS)}
+        for row, ratings in enumerate(ratings_list):
+            for skill, label in ratings.items():
+                col = self._index.get(skill)
+                if col is not None:
+                    matrix[row, col] = ranks.get(label, 0)
+        return matrix
+
+    def score_matrix(self, ratings: np.ndarray) -> np.ndarray:
+        # Coverage of each career level's expectations, shape (profiles x levels)
+        if not self.skills:
+            return np.zeros((ratings.shape[0], len(LEVELS)), dtype=np.float32)
+        return (ratings[:, None, :] >= self.targets[None, :, :]).mean(axis=2)
+
+    def level_indices(self, ratings: np.ndarray) -> np.ndarray:
+        # A level counts only if every level below it is met as well
+        met = np.logical_and.accumulate(self.score_matrix(ratings) >= PASS_THRESHOLD, axis=1)
+        return np.maximum(met.sum(axis=1) - 1, 0)
+
+    def assess_many(self, ratings_list: Sequence[Dict[str, str]]) -> List[str]:
+        return [LEVELS[i] for i in self.level_indices(self.encode(ratings_list))]
+
+    def assess(self, user_skill_ratings: Dict[str, str]) -> Dict:
+        """
+        Returns {'level', 'coverage', 'next_level', 'gaps'} for one user, where gaps is a
+        per-skill table of expected vs. rated proficiency for the next level.
+        """
+        ratings = self.encode([user_skill_ratings])
+        scores = self.score_matrix(ratings)[0]
+        index = int(self.level_indices(ratings)[0])
+        next_index = min(index + 1, len(LEVELS) - 1)
+        target = self.targets[next_index] if self.skills else np.zeros(0)
+        gaps = []
+        for i, skill in enumerate(self.skills):
+            rated = int(ratings[0, i])
+            expected = int(target[i])
+            gaps.append({
+                'skill': skill,
+                'required': PROFICIENCY_LABELS[int(self.required[i]) - 1],
+                'expected': PROFICIENCY_LABELS[expected - 1],
+                'rated': PROFICIENCY_LABELS[rated - 1] if rated else '-',
+                'gap': max(expected - rated, 0),
+            })
+        return {
+            'level': LEVELS[index],
+            'coverage': float(scores[index]),
+            'next_level': LEVELS[next_index] if next_index != index else None,
+            'gaps': gaps,
+        }
+
+
+def format_verdict(assessment: Dict) -> str:
+    verdict = (f"Based on your skill profile, your current level is {assessment['level']} "
+               f"({assessment['coverage']:.0%} of {assessment['level']}-level expectations met).")
+    if assessment['next_level']:
+        open_gaps = sum(1 for g in assessment['gaps'] if g['gap'] > 0)
+        verdict += f" {open_gaps} skill(s) to develop for {assessment['next_level']}."
+    return verdict
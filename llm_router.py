@@ -0,0 +1,394 @@
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional
+from telemetry import span
+
+# Ordered provider list; later providers are fallbacks (and the hedge target)
+LLM_PROVIDERS = os.getenv("LLM_PROVIDERS", "azure")
+DEFAULT_TIMEOUT = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+BACKOFF_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", "0.5"))
+# Consecutive retryable failures that open a provider's circuit, and how long it stays open
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+# Hedging: if the primary has not answered after its p95 latency, the next provider is fired too
+HEDGE = os.getenv("LLM_HEDGE", "").lower() in ("1", "true", "yes")
+HEDGE_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "2"))
+HEDGE_MIN_SAMPLES = 20
+# Keep-alive connection pool per streaming client, and one for litellm (dspy completions),
+# shared by every request in the process
+MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+
+RETRYABLE_NAMES = ('RateLimit', 'Timeout', 'Connection', 'Unavailable', 'InternalServer')
+
+
+def is_retryable(exc: Exception) -> bool:
+    status = getattr(exc, 'status_code', None) or getattr(getattr(exc, 'response', None), 'status_code', None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return any(name in type(exc).__name__ for name in RETRYABLE_NAMES)
+
+
+class ProvidersUnavailableError(RuntimeError):
+    """Every configured provider has an open circuit."""
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN_SECONDS):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self._opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        # After the cooldown a single trial call is let through; its outcome closes or reopens the circuit
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self._trial or self._consecutive >= self.failures:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+
+class Provider:
+    """
+    One LLM backend: a dspy LM for completions and an OpenAI-compatible client for
+    streaming, both created on first use. Keeps its own timeout, circuit breaker and
+    a window of recent latencies for the hedging delay.
+    """
+    def __init__(
+        self,
+        name: str,
+        lm_factory: Optional[Callable] = None,
+        client_factory: Optional[Callable] = None,
+        stream_model: Optional[str] = None,
+        timeout: Optional[float] = None,
+        lm=None,
+        client=None
+    ):
+        self.name = name
+        self.timeout = timeout if timeout is not None else float(
+            os.getenv(f"LLM_{name.upper()}_TIMEOUT_SECONDS", DEFAULT_TIMEOUT))
+        self.stream_model = stream_model
+        self.breaker = CircuitBreaker()
+        self._lm, self._lm_factory = lm, lm_factory
+        self._client, self._client_factory = client, client_factory
+        self._latencies = deque(maxlen=200)
+        self._lock = threading.Lock()
+
+    @property
+    def lm(self):
+        if self._lm is None:
+            with self._lock:
+                if self._lm is None:
+                    self._lm = self._lm_factory(self.timeout)
+        return self._lm
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._client_factory(self.timeout)
+        return self._client
+
+    def observe(self, seconds: float):
+        self._latencies.append(seconds)
+
+    def hedge_delay(self) -> float:
+        # p95 of recent successful calls, or the configured delay until there are enough samples
+        samples = sorted(self._latencies)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DELAY_SECONDS
+        return samples[int(0.95 * (len(samples) - 1))]
+
+
+def _http_client(timeout):
+    import httpx
+    return httpx.Client(timeout=timeout, limits=httpx.Limits(max_connections=MAX_CONNECTIONS,
+                                                             max_keepalive_connections=MAX_CONNECTIONS))
+
+
+_litellm_lock = threading.Lock()
+
+
+def _share_litellm_pool():
+    # dspy.LM completions go through litellm, which sends them over litellm.client_session when
+    # it is set; the timeout is still per request (the provider's)
+    import litellm
+    with _litellm_lock:
+        if litellm.client_session is None:
+            litellm.client_session = _http_client(DEFAULT_TIMEOUT)
+
+
+def _require_env(provider: str, *names: str):
+    # Checked when the provider's first client is built, so imports never fail on configuration
+    missing = [name for name in names if not os.getenv(name)]
+    if missing:
+        raise RuntimeError(f"{provider} LLM provider is not configured: set {', '.join(missing)}")
+
+
+AZURE_ENV = ("AZURE_OPENAI_KEY", "AZURE_OPENAI_ENDPOINT", "AZURE_OPENAI_API_VERSION")
+
+
+def _azure_provider() -> Provider:
+    def lm_factory(timeout):
+        _require_env("azure", *AZURE_ENV, "AZURE_OPENAI_MODEL_NAME")
+        import dspy
+        _share_litellm_pool()
+        return dspy.LM(
+            model=os.getenv("AZURE_OPENAI_MODEL_NAME"),
+            api_key=os.getenv("AZURE_OPENAI_KEY"),
+            api_base=os.getenv("AZURE_OPENAI_ENDPOINT"),
+            api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+            deployment_id=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
+            num_retries=0,
+            timeout=timeout,
+        )
+
+    def client_factory(timeout):
+        _require_env("azure", *AZURE_ENV, "AZURE_OPENAI_DEPLOYMENT_NAME")
+        from openai import AzureOpenAI
+        return AzureOpenAI(
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+            api_key=os.getenv("AZURE_OPENAI_KEY"),
+            api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+            timeout=timeout,
+            max_retries=0,
+            http_client=_http_client(timeout),
+        )
+    return Provider("azure", lm_factory, client_factory, stream_model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"))
+
+
+def _groq_provider() -> Provider:
+    model = os.getenv("GROQ_MODEL_NAME", "groq/llama3-70b-8192")
+
+    def lm_factory(timeout):
+        _require_env("groq", "GROQ_API_KEY")
+        import dspy
+        _share_litellm_pool()
+        return dspy.LM(model=model, api_key=os.getenv("GROQ_API_KEY"), num_retries=0, timeout=timeout)
+
+    def client_factory(timeout):
+        _require_env("groq", "GROQ_API_KEY")
+        from groq import Groq
+        return Groq(api_key=os.getenv("GROQ_API_KEY"), timeout=timeout, max_retries=0,
+                    http_client=_http_client(timeout))
+    return Provider("groq", lm_factory, client_factory, stream_model=model.split("/", 1)[-1])
+
+
+PROVIDER_FACTORIES: Dict[str, Callable[[], Provider]] = {
+    "azure": _azure_provider,
+    "groq": _groq_provider,
+}
+
+
+def _text(response) -> str:
+    # dspy LM calls return a list of completions
+    if isinstance(response, list):
+        return "\n".join(str(r) for r in response)
+    return str(response)
+
+
+class LLMRouter:
+    """
+    Sends each LLM call to the first healthy provider in order. A call gets the provider's
+    timeout and up to `retries` jittered retries on retryable errors before falling back to
+    the next provider; providers whose circuit is open are skipped. With hedge=True, a call
+    still pending after the primary's p95 latency is also fired at the next provider, and the
+    first answer wins.
+    """
+    def __init__(self, providers: List[Provider], retries: int = RETRIES, backoff: float = BACKOFF_SECONDS,
+                 hedge: bool = HEDGE):
+        if not providers:
+            raise ValueError("LLMRouter needs at least one provider")
+        self.providers = providers
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge = hedge
+        self._executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_MAX_WORKERS", "16")),
+                                            thread_name_prefix="llm-router")
+
+    def _candidates(self) -> Iterator[Provider]:
+        # Asks each breaker only when its provider is actually about to be tried
+        tried = False
+        for provider in self.providers:
+            if provider.breaker.allow():
+                tried = True
+                yield provider
+        if not tried:
+            raise ProvidersUnavailableError(
+                "All LLM providers are unavailable: " + ", ".join(f"{p.name} ({p.breaker.state})" for p in self.providers))
+
+    def _hedge_target(self, provider: Provider) -> Optional[Provider]:
+        if not self.hedge:
+            return None
+        later = self.providers[self.providers.index(provider) + 1:]
+        return next((p for p in later if p.breaker.state == "closed"), None)
+
+    def _submit(self, provider: Provider, fn: Callable):
+        start = time.perf_counter()
+
+        def run():
+            with span(f"llm.provider.{provider.name}"):
+                return fn(provider)
+        future = self._executor.submit(contextvars.copy_context().run, run)
+        # Latency of every successful call feeds the hedge delay, including hedges that lost
+        future.add_done_callback(
+            lambda f: provider.observe(time.perf_counter() - start) if f.exception() is None else None)
+        return future, provider, start + provider.timeout
+
+    def _race(self, attempts):
+        # Waits for the first successful attempt; attempts past their deadline count as timeouts
+        pending = {future: (provider, deadline) for future, provider, deadline in attempts}
+        error = None
+        while pending:
+            now = time.perf_counter()
+            for future, (provider, deadline) in list(pending.items()):
+                if deadline <= now and not future.done():
+                    del pending[future]
+                    provider.breaker.record_failure()
+                    error = TimeoutError(f"{provider.name} gave no response within {provider.timeout:g}s")
+            if not pending:
+                break
+            done, _ = wait(pending, timeout=min(d for _, d in pending.values()) - now, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider, _ = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # A non-retryable error (bad request, auth) still means the provider answered
+                    if is_retryable(e):
+                        provider.breaker.record_failure()
+                    else:
+                        provider.breaker.record_success()
+                    error = e
+                    continue
+                provider.breaker.record_success()
+                return result
+        raise error
+
+    def _attempt(self, provider: Provider, fallback: Optional[Provider], fn: Callable):
+        first = self._submit(provider, fn)
+        if fallback is None:
+            return self._race([first])
+        done, _ = wait([first[0]], timeout=min(provider.hedge_delay(), provider.timeout))
+        if done:
+            return self._race([first])
+        with span("llm.hedge"):
+            return self._race([first, self._submit(fallback, fn)])
+
+    def call(self, fn: Callable[[Provider], object]):
+        """
+        Runs fn(provider) against the providers in order until one succeeds. fn should make
+        exactly one LLM request through provider.lm or provider.client.
+        """
+        error = None
+        for provider in self._candidates():
+            hedge_to = self._hedge_target(provider)
+            for attempt in range(self.retries + 1):
+                try:
+                    return self._attempt(provider, hedge_to, fn)
+                except Exception as e:
+                    error = e
+                    if not is_retryable(e) or provider.breaker.state != "closed":
+                        break
+                    if attempt < self.retries:
+                        time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+        raise error
+
+    def complete(self, prompt: Optional[str] = None, messages: Optional[List[Dict]] = None, **kwargs) -> str:
+        return _text(self.call(lambda provider: provider.lm(prompt=prompt, messages=messages, **kwargs)))
+
+    def stream(self, messages: List[Dict], **kwargs) -> Iterator[str]:
+        """
+        Yields the text of a streamed chat completion. Retries and failover happen only
+        until the first content chunk arrives; no hedging, since chunks cannot be merged.
+        """
+        error = None
+        for provider in self._candidates():
+            for attempt in range(self.retries + 1):
+                start = time.perf_counter()
+                try:
+                    chunks = iter(provider.client.chat.completions.create(
+                        model=provider.stream_model, messages=messages, stream=True, timeout=provider.timeout,
+                        **kwargs))
+                    first = None
+                    while first is None:
+                        chunk = next(chunks)
+                        # Azure sends a leading chunk with no choices (content filter results)
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            first = chunk.choices[0].delta.content
+                except StopIteration:
+                    provider.breaker.record_success()
+                    return
+                except Exception as e:
+                    error = e
+                    if is_retryable(e):
+                        provider.breaker.record_failure()
+                    else:
+                        provider.breaker.record_success()
+                    if not is_retryable(e) or provider.breaker.state != "closed":
+                        break
+                    if attempt < self.retries:
+                        time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+                    continue
+                provider.breaker.record_success()
+                provider.observe(time.perf_counter() - start)
+                yield first
+                for chunk in chunks:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+                return
+        raise error
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> LLMRouter:
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                names = [name.strip().lower() for name in LLM_PROVIDERS.split(",") if name.strip()]
+                unknown = [name for name in names if name not in PROVIDER_FACTORIES]
+                if unknown:
+                    raise ValueError(f"Unknown LLM provider(s) {unknown}; choose from {list(PROVIDER_FACTORIES)}")
+                _router = LLMRouter([PROVIDER_FACTORIES[name]() for name in names])
+    return _router
+
+
+def set_router(router: Optional[LLMRouter]):
+    """Replaces the process-wide router (None rebuilds it from the environment on next use)."""
+    global _router
+    with _router_lock:
+        _router = router
@@ -3,4 +3,5 @@
 from vector_store import DesignationVectorStore
 
 store = DesignationVectorStore()
-store.load_data("data.csv")
+# Only new or changed rows are embedded; rows gone from the file are removed
+store.sync("data.csv")
@@ -0,0 +1,354 @@
+import json
+import os
+import threading
+from typing import Dict, List, NamedTuple, Optional
+import numpy as np
+
+QUANTIZATIONS = (None, "float16", "int8")
+# Quantized rows are upcast to float32 this many at a time, keeping the temporary small
+SCORE_BLOCK_ROWS = 1024
+
+# Row files are raw row-major arrays (no .npy header), so upserts append or overwrite rows in place
+_ROW_FILES = {None: ("embeddings.f32", np.float32), "float16": ("embeddings.f16", np.float16),
+              "int8": ("embeddings.i8", np.int8)}
+_SCALES_FILE = "scales.i8.f32"
+_RECORDS_FILE = "records.jsonl"
+
+
+def _normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class _State(NamedTuple):
+    # Everything a query reads, replaced as a whole so ids and vectors always match
+    ids: List[str]
+    documents: List[str]
+    metadatas: List[Dict]
+    positions: Dict[str, int]
+    matrix: np.ndarray
+    scales: Optional[np.ndarray]
+    masks: Dict
+    dim: int
+    # Bytes of complete lines in records.jsonl, and its (mtime, size) when read
+    length: int
+    stamp: Optional[tuple]
+
+
+class NumpyCollection:
+    """
+    Exact-search alternative to a Chroma collection for small corpora.
+
+    L2-normalized embeddings live in a contiguous row file that is memory-mapped for
+    search (optionally quantized to float16 or int8 with per-row scales). A query is one
+    matrix-vector product plus argpartition; `where` equality filters use boolean masks
+    precomputed per metadata value. Upserts append or overwrite only their own rows and
+    append their records to a JSONL log; deletes compact the files. Changes made by other
+    processes are picked up on the next call. Implements the subset of the Chroma
+    collection API that DesignationVectorStore uses (get, upsert, delete, query, count).
+    """
+    def __init__(self, path, quantization=None):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"quantization must be one of {QUANTIZATIONS}, got {quantization!r}")
+        self.path = path
+        self.quantization = quantization
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._migrate()
+            self._load()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self._file(_RECORDS_FILE))
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_records(self):
+        # (ids, documents, metadatas, dim, length): a header line with the dimension, then one
+        # line per written record, later lines replacing the record at their row
+        ids, documents, metadatas, dim, length = [], [], [], 0, 0
+        try:
+            with open(self._file(_RECORDS_FILE), "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    if not line.endswith(b"\n"):
+                        break  # Cut short by an interrupted write
+                    length += len(line)
+                    if "dim" in record:
+                        dim = record["dim"]
+                        continue
+                    row = record["row"]
+                    if row == len(ids):
+                        ids.append(record["id"])
+                        documents.append(record["document"])
+                        metadatas.append(record["metadata"])
+                    else:
+                        ids[row], documents[row], metadatas[row] = record["id"], record["document"], record["metadata"]
+        except FileNotFoundError:
+            pass
+        return ids, documents, metadatas, dim, length
+
+    @staticmethod
+    def _record_lines(records):
+        return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+
+    def _append_records(self, records, length, dim):
+        # Appended after the last complete line, so a partial line left by a crash is overwritten.
+        # Returns the new length of the log
+        path = self._file(_RECORDS_FILE)
+        with open(path, "r+b" if length else "wb") as f:
+            if length:
+                f.truncate(length)
+                f.seek(length)
+            else:
+                f.write(self._record_lines([{"dim": dim}]))
+            f.write(self._record_lines(records))
+            return f.tell()
+
+    def _write_records(self, ids, documents, metadatas, dim):
+        # Compacted log, renamed into place: rows past len(ids) in the row files are ignored
+        tmp = self._file(_RECORDS_FILE + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(self._record_lines([{"dim": dim}] + [
+                {"row": p, "id": doc_id, "document": doc, "metadata": meta}
+                for p, (doc_id, doc, meta) in enumerate(zip(ids, documents, metadatas))
+            ]))
+        os.replace(tmp, self._file(_RECORDS_FILE))
+
+    def _migrate(self):
+        # Indexes saved as records.json plus .npy matrices are converted once to the log layout
+        legacy = self._file("records.json")
+        if not os.path.exists(legacy):
+            return
+        with open(legacy, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        full = np.load(self._file("embeddings.npy")) if records["ids"] else np.zeros((0, 0), np.float32)
+        self._replace(_ROW_FILES[None][0], full.astype(np.float32))
+        self._write_records(records["ids"], records["documents"], records["metadatas"], int(full.shape[1]))
+        for name in ("records.json", "embeddings.npy", "embeddings.float16.npy", "embeddings.int8.npy",
+                     "scales.int8.npy"):
+            if os.path.exists(self._file(name)):
+                os.remove(self._file(name))
+
+    def _quantize(self, rows):
+        # (search rows, per-row scales or None) for this collection's quantization
+        if self.quantization == "float16":
+            return rows.astype(np.float16), None
+        if self.quantization == "int8":
+            scales = np.abs(rows).max(axis=1) / 127
+            scales[scales == 0] = 1
+            return np.round(rows / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        return rows, None
+
+    def _replace(self, name, array):
+        # Write to a temp file and rename, so readers never map a half-written file
+        tmp = self._file(name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(np.ascontiguousarray(array).tobytes())
+        os.replace(tmp, self._file(name))
+
+    def _write_rows(self, name, count, updates, appended):
+        # Overwrites rows at their positions and appends new rows after the first count rows
+        path = self._file(name)
+        with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+            for position, row in updates:
+                f.seek(position * row.nbytes)
+                f.write(row.tobytes())
+            if len(appended):
+                row_bytes = appended[0].nbytes
+                # Drops rows an interrupted write left past the records
+                f.truncate(count * row_bytes)
+                f.seek(count * row_bytes)
+                f.write(np.ascontiguousarray(appended).tobytes())
+
+    def _rows_complete(self, name, dtype, rows, width):
+        try:
+            return os.path.getsize(self._file(name)) >= rows * width * np.dtype(dtype).itemsize
+        except OSError:
+            return False
+
+    def _search_complete(self, count, dim):
+        # Whether this collection's quantized rows (and scales) cover every record
+        if not self.quantization:
+            return True
+        name, dtype = _ROW_FILES[self.quantization]
+        return self._rows_complete(name, dtype, count, dim) and (
+            self.quantization != "int8" or self._rows_complete(_SCALES_FILE, np.float32, count, 1))
+
+    def _drop_search_files(self, keep=None):
+        # Quantized files of other collections on this path are stale after a write; they are rebuilt on load
+        for quantization in ("float16", "int8"):
+            if quantization != keep:
+                names = [_ROW_FILES[quantization][0]] + ([_SCALES_FILE] if quantization == "int8" else [])
+                for name in names:
+                    if os.path.exists(self._file(name)):
+                        os.remove(self._file(name))
+
+    def _matrices(self, count, dim):
+        # Memory-mapped search rows (and int8 scales), quantized from the full rows if missing
+        name, dtype = _ROW_FILES[self.quantization]
+        if not count:
+            return np.zeros((0, dim), np.float32), None
+        if not self._search_complete(count, dim):
+            full = np.memmap(self._file(_ROW_FILES[None][0]), dtype=np.float32, mode="r", shape=(count, dim))
+            rows, row_scales = self._quantize(np.asarray(full))
+            self._replace(name, rows)
+            if row_scales is not None:
+                self._replace(_SCALES_FILE, row_scales)
+        matrix = np.memmap(self._file(name), dtype=dtype, mode="r", shape=(count, dim))
+        scales = np.memmap(self._file(_SCALES_FILE), dtype=np.float32, mode="r", shape=(count,)) \
+            if self.quantization == "int8" else None
+        return matrix, scales
+
+    def _load(self):
+        # Called with self._lock held; readers pick up the new state with one reference swap
+        stamp = self._stamp()
+        ids, documents, metadatas, dim, length = self._read_records()
+        matrix, scales = self._matrices(len(ids), dim)
+        self._state = _State(ids, documents, metadatas, {doc_id: i for i, doc_id in enumerate(ids)},
+                             matrix, scales, {}, dim, length, stamp)
+
+    def _reload_if_changed(self):
+        # Called with self._lock held
+        if self._stamp() != self._state.stamp:
+            self._load()
+
+    def _current(self) -> _State:
+        state = self._state
+        if self._stamp() != state.stamp:
+            with self._lock:
+                self._reload_if_changed()
+                state = self._state
+        return state
+
+    def count(self):
+        return len(self._current().ids)
+
+    def get(self, ids=None, include=None):
+        state = self._current()
+        positions = range(len(state.ids)) if ids is None else [state.positions[i] for i in ids if i in state.positions]
+        return {
+            "ids": [state.ids[p] for p in positions],
+            "documents": [state.documents[p] for p in positions],
+            "metadatas": [state.metadatas[p] for p in positions],
+        }
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        with self._lock:
+            self._reload_if_changed()
+            state = self._state
+            new = _normalize(embeddings)
+            count = len(state.ids)
+            dim = state.dim if count else new.shape[1]
+            if new.shape[1] != dim:
+                raise ValueError(f"Embedding dimension {new.shape[1]} does not match the collection's {dim}")
+            all_ids, all_docs, all_metas = list(state.ids), list(state.documents), list(state.metadatas)
+            positions = dict(state.positions)
+            written = {}
+            for i, (doc_id, doc, meta) in enumerate(zip(ids, documents, metadatas)):
+                p = positions.get(doc_id)
+                if p is None:
+                    p = positions[doc_id] = len(all_ids)
+                    all_ids.append(doc_id)
+                    all_docs.append(doc)
+                    all_metas.append(meta)
+                else:
+                    all_docs[p], all_metas[p] = doc, meta
+                # Repeated ids in one batch: the last vector wins
+                written[p] = i
+            updated = sorted((p, i) for p, i in written.items() if p < count)
+            appended = [written[p] for p in range(count, len(all_ids))]
+
+            def write(name, rows):
+                self._write_rows(name, count, [(p, rows[i]) for p, i in updated], rows[appended])
+
+            write(_ROW_FILES[None][0], new)
+            if self._search_complete(count, dim):
+                if self.quantization:
+                    rows, row_scales = self._quantize(new)
+                    write(_ROW_FILES[self.quantization][0], rows)
+                    if row_scales is not None:
+                        write(_SCALES_FILE, row_scales[:, None])
+                self._drop_search_files(keep=self.quantization)
+            else:
+                # Dropped by another collection's write: rebuilt from the full rows below
+                self._drop_search_files()
+            records = [{"row": p, "id": all_ids[p], "document": all_docs[p], "metadata": all_metas[p]}
+                       for p in sorted(written)]
+            length = self._append_records(records, state.length, int(dim))
+            # The batch is applied to a copy of the state; the log is not read back
+            matrix, scales = self._matrices(len(all_ids), int(dim))
+            self._state = _State(all_ids, all_docs, all_metas, positions, matrix, scales, {}, int(dim),
+                                 length, self._stamp())
+
+    def delete(self, ids):
+        with self._lock:
+            self._reload_if_changed()
+            state = self._state
+            drop = {state.positions[i] for i in ids if i in state.positions}
+            if not drop:
+                return
+            keep = [p for p in range(len(state.ids)) if p not in drop]
+            full = np.memmap(self._file(_ROW_FILES[None][0]), dtype=np.float32, mode="r",
+                             shape=(len(state.ids), state.dim))
+            self._replace(_ROW_FILES[None][0], full[keep])
+            self._drop_search_files()
+            self._write_records([state.ids[p] for p in keep], [state.documents[p] for p in keep],
+                                [state.metadatas[p] for p in keep], state.dim)
+            self._load()
+
+    def _mask(self, state, where):
+        # Equality filters only ({"designation": "..."}); one cached mask per key/value pair
+        mask = None
+        for key, value in where.items():
+            if (key, value) not in state.masks:
+                state.masks[(key, value)] = np.array([m.get(key) == value for m in state.metadatas], dtype=bool)
+            mask = state.masks[(key, value)] if mask is None else mask & state.masks[(key, value)]
+        return mask
+
+    def _scores(self, state, queries):
+        # Cosine similarities for the whole batch of queries, shape (queries x documents)
+        matrix = state.matrix
+        if self.quantization is None:
+            return queries @ matrix.T
+        scores = np.empty((queries.shape[0], matrix.shape[0]), dtype=np.float32)
+        for start in range(0, matrix.shape[0], SCORE_BLOCK_ROWS):
+            block = np.asarray(matrix[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+            scores[:, start:start + SCORE_BLOCK_ROWS] = queries @ block.T
+        if self.quantization == "int8":
+            scores *= state.scales[None, :]
+        return scores
+
+    def query(self, query_embeddings, n_results=10, where=None):
+        state = self._current()
+        queries = _normalize(query_embeddings)
+        results = {"ids": [], "distances": [], "documents": [], "metadatas": []}
+        if not state.ids:
+            for key in results:
+                results[key] = [[] for _ in queries]
+            return results
+        scores = self._scores(state, queries)
+        if where:
+            scores = np.where(self._mask(state, where)[None, :], scores, -np.inf)
+        k = min(n_results, scores.shape[1])
+        for row in scores:
+            top = np.argpartition(-row, k - 1)[:k] if k < row.shape[0] else np.arange(row.shape[0])
+            top = top[np.argsort(-row[top])]
+            top = top[np.isfinite(row[top])]
+            results["ids"].append([state.ids[p] for p in top])
+            # Squared L2 distance between unit vectors, matching Chroma's default space
+            results["distances"].append([float(2 - 2 * row[p]) for p in top])
+            results["documents"].append([state.documents[p] for p in top])
+            results["metadatas"].append([state.metadatas[p] for p in top])
+        return results
@@ -0,0 +1,255 @@
+# pregenerate.py
+#
+# Pre-generate career path recommendations for the most likely skill profiles of every
+# designation, so the app serves them without waiting for the LLM.
+#
+#   python pregenerate.py --budget 200 --concurrency 4
+#   python pregenerate.py --budget 500 --roster roster.jsonl   # rank buckets by observed profiles
+#
+# A profile is quantized to one rating (1..5) per framework column: the mean of the user's
+# ratings for that column's skills, rounded. At request time the user's unrounded column
+# means are matched to the nearest stored bucket (RMS distance in proficiency steps) and its
+# recommendation is served when the distance is within PREGENERATED_MAX_DISTANCE.
+# Reruns skip buckets already generated for the current prompt version.
+
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from catalog import SKILL_LEVELS
+from level_assessment import LEVEL_CAPS, PROFICIENCY_LABELS
+
+PREGENERATED_PATH = os.getenv("PREGENERATED_PATH", "pregenerated.sqlite3")
+MAX_DISTANCE = float(os.getenv("PREGENERATED_MAX_DISTANCE", "0.5"))
+
+_RANKS = {label: i for i, label in enumerate(PROFICIENCY_LABELS, start=1)}
+
+
+def profile_columns(skills_dict: Dict[str, List[str]]) -> List[Tuple[int, List[str]]]:
+    # (required rank, skills) per non-empty framework column; a skill counts in its first column
+    columns, seen = [], set()
+    for rank, level in enumerate(SKILL_LEVELS, start=1):
+        skills = [s for s in dict.fromkeys(skills_dict.get(level, [])) if s not in seen]
+        seen.update(skills)
+        if skills:
+            columns.append((rank, skills))
+    return columns
+
+
+def profile_hash(columns) -> str:
+    # Buckets are only comparable while the designation's skill columns stay the same
+    return hashlib.sha256(json.dumps(columns, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+def profile_vector(columns, user_skill_ratings: Dict[str, str]) -> np.ndarray:
+    # Mean rating per column, unrated skills counting as 0
+    return np.array([np.mean([_RANKS.get(user_skill_ratings.get(s), 0) for s in skills])
+                     for _, skills in columns], dtype=np.float32)
+
+
+def bucket_of(columns, user_skill_ratings: Dict[str, str]) -> Tuple[int, ...]:
+    return tuple(int(v) for v in np.clip(np.rint(profile_vector(columns, user_skill_ratings)), 1, 5))
+
+
+def bucket_ratings(columns, bucket: Tuple[int, ...]) -> Dict[str, str]:
+    # The representative profile: every skill of a column rated at the bucket's value
+    return {skill: PROFICIENCY_LABELS[value - 1] for (_, skills), value in zip(columns, bucket) for skill in skills}
+
+
+def ranked_buckets(columns, observed: Optional[Counter] = None) -> List[Tuple[int, ...]]:
+    """
+    Every bucket of the designation, most likely first: buckets seen in a roster by
+    frequency, then the rest by their distance to the nearest "typical" profile of a career
+    level (each column rated at min(required, level cap)).
+    """
+    required = np.array([rank for rank, _ in columns], dtype=np.float32)
+    typical = np.minimum(required[None, :], LEVEL_CAPS[:, None])
+    buckets = list(itertools.product(range(1, 6), repeat=len(columns)))
+    distance = np.abs(np.array(buckets, dtype=np.float32)[:, None, :] - typical[None, :, :]).sum(axis=2).min(axis=1)
+    observed = observed or Counter()
+    order = sorted(range(len(buckets)), key=lambda i: (-observed[buckets[i]], distance[i], buckets[i]))
+    return [buckets[i] for i in order]
+
+
+class PregeneratedStore:
+    """
+    Recommendations per (competency, designation, profile hash, prompt version, bucket) in a
+    local SQLite file, indexed for the per-designation nearest-bucket lookup.
+    """
+    def __init__(self, path: str = PREGENERATED_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(recommendations)")]
+        if columns and "competency" not in columns:
+            # Stores written before rows were keyed by competency; the job regenerates them
+            print(f"⚠️ {path} predates per-competency keys; dropping its recommendations.")
+            self._conn.execute("DROP TABLE recommendations")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS recommendations ("
+            " competency TEXT NOT NULL,"
+            " designation TEXT NOT NULL,"
+            " profile TEXT NOT NULL,"
+            " version TEXT NOT NULL,"
+            " bucket TEXT NOT NULL,"
+            " verdict TEXT NOT NULL,"
+            " recommendation TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (competency, designation, profile, version, bucket))"
+        )
+
+    def buckets(self, competency: str, designation: str, profile: str, version: str) -> Dict[Tuple[int, ...], str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT bucket, recommendation FROM recommendations"
+                " WHERE competency = ? AND designation = ? AND profile = ? AND version = ?",
+                (competency, designation, profile, version)
+            ).fetchall()
+        return {tuple(json.loads(bucket)): recommendation for bucket, recommendation in rows}
+
+    def put(self, competency: str, designation: str, profile: str, version: str, bucket: Tuple[int, ...],
+            verdict: str, recommendation: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO recommendations VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (competency, designation, profile, version, json.dumps(list(bucket)), verdict, recommendation, time.time()),
+            )
+
+    def nearest(self, competency: str, designation: str, skills_dict: Dict[str, List[str]], user_skill_ratings: Dict[str, str],
+                version: str, max_distance: float = MAX_DISTANCE) -> Optional[Tuple[str, float]]:
+        """(recommendation, distance) of the closest stored bucket, or None if none is within max_distance."""
+        columns = profile_columns(skills_dict)
+        stored = self.buckets(competency, designation, profile_hash(columns), version) if columns else {}
+        if not stored:
+            self.misses += 1
+            return None
+        keys = list(stored)
+        vector = profile_vector(columns, user_skill_ratings)
+        distances = np.sqrt(((np.array(keys, dtype=np.float32) - vector[None, :]) ** 2).mean(axis=1))
+        best = int(distances.argmin())
+        if distances[best] > max_distance:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return stored[keys[best]], float(distances[best])
+
+    def stats(self) -> Dict:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM recommendations").fetchone()[0]
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0,
+                "entries": size, "max_distance": MAX_DISTANCE, "path": self.path}
+
+
+_store: Optional[PregeneratedStore] = None
+_store_lock = threading.Lock()
+
+
+def get_pregenerated_store() -> Optional[PregeneratedStore]:
+    # None until the offline job has created the store; the app never creates it
+    global _store
+    with _store_lock:
+        if _store is None and os.path.exists(PREGENERATED_PATH):
+            _store = PregeneratedStore()
+        return _store
+
+
+def plan(competency_data, store: PregeneratedStore, version: str, per_designation: int, budget: int,
+         observed: Dict[Tuple[str, str], Counter]) -> List[Tuple]:
+    # Round-robin over designations by bucket rank, so a small budget covers every designation's top buckets
+    queues = []
+    for competency in competency_data.get_competencies():
+        for designation in competency_data.get_designations(competency) if competency else []:
+            skills_dict = competency_data.get_skills_for_designation(competency, designation)
+            columns = profile_columns(skills_dict)
+            if not columns:
+                continue
+            profile = profile_hash(columns)
+            done = store.buckets(competency, designation, profile, version)
+            ranked = ranked_buckets(columns, observed.get((competency, designation)))[:per_designation]
+            queues.append([(competency, designation, skills_dict, columns, profile, bucket)
+                           for bucket in ranked if bucket not in done])
+    jobs = []
+    for rank in range(per_designation):
+        for queue in queues:
+            if rank < len(queue) and len(jobs) < budget:
+                jobs.append(queue[rank])
+    return jobs
+
+
+async def run(args):
+    # The job's imports stay out of the request path, which only needs the store
+    import asyncio
+    from ai_utils import assess_and_recommend, prompt_fingerprint
+    from competency_data import get_competency_data
+
+    competency_data = get_competency_data(args.competency_csv)
+    store = PregeneratedStore(args.output)
+    version = prompt_fingerprint()
+    observed: Dict[Tuple[str, str], Counter] = {}
+    if args.roster:
+        from bulk_assess import read_roster
+        for row in read_roster(args.roster):
+            if row.get('parse_error'):
+                continue
+            skills_dict = competency_data.get_skills_for_designation(row.get('competency', ''), row.get('designation', ''))
+            columns = profile_columns(skills_dict)
+            if columns:
+                observed.setdefault((row['competency'], row['designation']), Counter())[bucket_of(columns, row['skill_ratings'])] += 1
+    jobs = plan(competency_data, store, version, args.per_designation, args.budget, observed)
+    print(f"{len(jobs)} buckets to generate (budget {args.budget}, {args.per_designation} per designation).")
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    counts = {'ok': 0, 'failed': 0}
+
+    async def generate(job):
+        competency, designation, skills_dict, columns, profile, bucket = job
+        ratings = bucket_ratings(columns, bucket)
+        certifications = competency_data.get_certifications_for_designation(competency, designation)
+        career_step = competency_data.skill_graph.path(competency, designation, user_skill_ratings=ratings)
+        async with semaphore:
+            try:
+                # refresh: a bucket is always generated fresh, never served from another bucket
+                verdict, recommendation = await asyncio.to_thread(
+                    assess_and_recommend, designation, skills_dict, ratings, certifications,
+                    career_step=career_step, refresh=True, competency=competency
+                )
+            except Exception as e:
+                counts['failed'] += 1
+                print(f"⚠️ {designation} {bucket}: {type(e).__name__}: {e}")
+                return
+        if recommendation:
+            store.put(competency, designation, profile, version, bucket, verdict, recommendation)
+            counts['ok'] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(generate(job) for job in jobs))
+    print(f"✅ {counts['ok']} generated, {counts['failed']} failed in {time.perf_counter() - start:.1f}s "
+          f"({store.stats()['entries']} stored in {args.output}).")
+
+
+def main():
+    import argparse
+    import asyncio
+    parser = argparse.ArgumentParser(description="Pre-generate recommendations for quantized skill profiles.")
+    parser.add_argument("--competency-csv", default="competency-data.csv")
+    parser.add_argument("--output", default=PREGENERATED_PATH, help="SQLite store read by the app")
+    parser.add_argument("--budget", type=int, default=200, help="Most LLM calls in this run")
+    parser.add_argument("--per-designation", type=int, default=20, help="Most buckets per designation")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--roster", help="Roster (.csv or .jsonl, bulk_assess format) to rank buckets by")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+from competency_data import SKILL_LEVELS
+from level_assessment import LEVELS, PROFICIENCY_LABELS
+
+# Upper bound for the user message (the system prompt is static and not counted against it)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "400"))
+# tiktoken encoding used to count tokens locally; falls back to ~4 characters per token
+PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", "o200k_base")
+# tiktoken downloads the encoding on first use; offline, the estimate is used after this many seconds
+PROMPT_TOKENIZER_TIMEOUT = float(os.getenv("PROMPT_TOKENIZER_TIMEOUT", "3"))
+
+# Static, so it forms an identical prefix on every request and provider-side prefix caching applies.
+# Everything request-specific goes into the user message built by build_prompt.
+SYSTEM_PROMPT = f"""
+You are an expert career advisor for software engineers. The user's current level ({', '.join(LEVELS)}) has already been assessed from their self-rated skills against the competency framework.
+
+The profile is encoded compactly. Proficiencies use the scale {', '.join(f'{i}={label}' for i, label in enumerate(PROFICIENCY_LABELS, start=1))} (0 = not rated). Skills are grouped by the framework column they are listed under; each group shows how many of its skills already meet the target level, followed by the open gaps as "skill rated>expected". Gaps are listed largest first and may be truncated.
+
+When a next designation is given, its new skills ("skill >needed proficiency") and certifications were already worked out from the framework: explain how to acquire them rather than deriving the next role yourself.
+
+"Framework reference" lines are the organisation's own performance metrics and developmental activities for related competencies: base the metrics and activities you suggest on them instead of inventing generic ones, and keep the answer concise.
+
+Recommend a career path to the target level: summarise the skills to focus on in a table, and the certifications to pursue. If the user is already at Expert, suggest upskilling in trending areas or exploring other designations.
+"""
+
+_RANKS = {label: i for i, label in enumerate(PROFICIENCY_LABELS, start=1)}
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _load_encoding():
+    # Loaded in a daemon thread so a download that never answers cannot block the request
+    loaded = []
+
+    def load():
+        try:
+            import tiktoken
+            loaded.append(tiktoken.get_encoding(PROMPT_TOKENIZER))
+        except Exception:
+            pass  # tiktoken missing or its encoding file not downloadable
+    thread = threading.Thread(target=load, daemon=True)
+    thread.start()
+    thread.join(PROMPT_TOKENIZER_TIMEOUT)
+    if loaded:
+        return loaded[0]
+    print(f"⚠️ Tokenizer {PROMPT_TOKENIZER} unavailable, estimating prompt tokens as characters / 4")
+    return False
+
+
+def count_tokens(text: str) -> int:
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                _encoding = _load_encoding()
+    if _encoding:
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+
+def _render(designation, assessment, groups, open_gaps, kept, certifications, certs_kept, career_step, context):
+    keep = set(id(g) for g in open_gaps[:kept])
+    lines = [
+        f"Designation: {designation}",
+        f"Level: {assessment['level']} ({assessment['coverage']:.0%} met); target: {assessment['next_level'] or 'Expert'}",
+    ]
+    for column, entries in groups:
+        met = sum(1 for g in entries if g['gap'] == 0)
+        shown = ", ".join(f"{g['skill']} {g['rated_rank']}>{g['expected_rank']}" for g in entries if id(g) in keep)
+        lines.append(f"{column} ({met}/{len(entries)} met)" + (f": {shown}" if shown else ""))
+    if kept < len(open_gaps):
+        lines.append(f"(+{len(open_gaps) - kept} smaller gaps omitted)")
+    certs = "; ".join(certifications[:certs_kept])
+    if certs_kept < len(certifications):
+        certs += f" (+{len(certifications) - certs_kept} more)"
+    lines.append(f"Certifications: {certs or 'None'}")
+    if career_step:
+        step_skills = ", ".join(f"{skill} >{_RANKS[label]}" for skill, label in career_step['skills'].items())
+        lines.append(f"Next designation: {career_step['to']} ({career_step['level']}); "
+                     f"skills to add: {step_skills or 'None'}; "
+                     f"certifications to add: {'; '.join(career_step['certifications']) or 'None'}")
+    if context:
+        lines.append(f"Framework reference:\n{context}")
+    return "\n".join(lines)
+
+
+def build_prompt(
+    designation: str,
+    skills_dict: Dict[str, List[str]],
+    assessment: Dict,
+    certifications: List[str],
+    token_budget: Optional[int] = None,
+    career_step: Optional[Dict] = None,
+    context: Optional[str] = None
+) -> Tuple[str, Dict]:
+    """
+    Builds the user message for the recommendation: ratings grouped by framework column,
+    with only the gaps to the target level spelled out. While the message exceeds
+    token_budget (default PROMPT_TOKEN_BUDGET), the smallest gaps are dropped first,
+    then trailing certifications. career_step is a SkillGraph.path() result, listed as
+    the next designation with its skills and certifications. context (retrieved framework
+    descriptors, already trimmed) is appended and does not count against token_budget.
+    Returns (prompt, stats).
+    """
+    budget = PROMPT_TOKEN_BUDGET if token_budget is None else token_budget
+    if context:
+        budget += count_tokens(f"\nFramework reference:\n{context}")
+    by_skill = {g['skill']: g for g in assessment['gaps']}
+    groups, seen = [], set()
+    for level in SKILL_LEVELS:
+        entries = []
+        for skill in skills_dict.get(level, []):
+            if skill in by_skill and skill not in seen:
+                seen.add(skill)
+                g = by_skill[skill]
+                entries.append({**g, 'rated_rank': _RANKS.get(g['rated'], 0), 'expected_rank': _RANKS[g['expected']]})
+        if entries:
+            groups.append((level.replace('Skills: ', ''), entries))
+
+    # Most informative first: the largest gaps, then the most foundational skills
+    open_gaps = sorted((g for _, entries in groups for g in entries if g['gap'] > 0),
+                       key=lambda g: (-g['gap'], g['expected_rank']))
+    certifications = list(dict.fromkeys(c for c in certifications if c))
+
+    def render(kept, certs_kept):
+        return _render(designation, assessment, groups, open_gaps, kept, certifications, certs_kept, career_step,
+                       context)
+
+    # Binary search for the most gaps that fit, then the most certifications
+    kept, certs_kept = len(open_gaps), len(certifications)
+    if count_tokens(render(kept, certs_kept)) > budget:
+        lo, hi = 0, len(open_gaps)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if count_tokens(render(mid, certs_kept)) <= budget:
+                lo = mid
+            else:
+                hi = mid - 1
+        kept = lo
+        if kept == 0:
+            lo, hi = 0, len(certifications)
+            while lo < hi:
+                mid = (lo + hi + 1) // 2
+                if count_tokens(render(0, mid)) <= budget:
+                    lo = mid
+                else:
+                    hi = mid - 1
+            certs_kept = lo
+
+    prompt = render(kept, certs_kept)
+    return prompt, {
+        'prompt_tokens': count_tokens(prompt),
+        'skills': sum(len(entries) for _, entries in groups),
+        'gaps_listed': kept,
+        'gaps_dropped': len(open_gaps) - kept,
+        'certifications_dropped': len(certifications) - certs_kept,
+        'context_tokens': count_tokens(context) if context else 0,
+    }
@@ -0,0 +1,107 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from catalog import SKILL_LEVELS
+from level_assessment import LEVELS, PROFICIENCY_LABELS
+
+_RANKS = {label: i for i, label in enumerate(PROFICIENCY_LABELS, start=1)}
+
+
+def _requirements(skills_dict: Dict[str, List[str]]) -> Dict[str, int]:
+    # Required proficiency (1..5) of every skill: the first framework column it is listed under
+    required = {}
+    for rank, level in enumerate(SKILL_LEVELS, start=1):
+        for skill in skills_dict.get(level, []):
+            required.setdefault(skill, rank)
+    return required
+
+
+class SkillGraph:
+    """
+    Career ladders of the competency framework as a graph. Within each competency the
+    designations are ordered by their Level column (Entry, Mid, Senior, Expert; unknown
+    levels last, ties in file order) and linked by an edge to the next one. The gap from a
+    designation to any one above it is the skills the target requires at a higher
+    proficiency than the source does (or that the source does not list) and the target's
+    certifications the source lacks. Gaps for every pair on a ladder are computed once,
+    when the graph is built, so path queries are dictionary lookups.
+    """
+    def __init__(self, competency_data):
+        self.ladders: Dict[str, List[str]] = {}
+        self.levels: Dict[Tuple[str, str], str] = {}
+        self._required: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._certifications: Dict[Tuple[str, str], List[str]] = {}
+        # (competency, source, target) -> (skills {name: rank}, certifications), source below target
+        self._gaps: Dict[Tuple[str, str, str], Tuple[Dict[str, int], List[str]]] = {}
+
+        order = {level: i for i, level in enumerate(LEVELS)}
+        for competency in competency_data.get_competencies():
+            designations = list(dict.fromkeys(d for d in competency_data.get_designations(competency) if d))
+            if not competency or not designations:
+                continue
+            for designation in designations:
+                key = (competency, designation)
+                self.levels[key] = competency_data.get_level_for_designation(competency, designation)
+                self._required[key] = _requirements(competency_data.get_skills_for_designation(competency, designation))
+                self._certifications[key] = competency_data.get_certifications_for_designation(competency, designation)
+            ladder = sorted(designations, key=lambda d: order.get(self.levels[(competency, d)], len(LEVELS)))
+            self.ladders[competency] = ladder
+            self._build_gaps(competency, ladder)
+
+    def _gap(self, competency, source, target):
+        # Only what the target itself requires; skills of intermediate steps the target does not list are left out
+        held = self._required[(competency, source)]
+        required = self._required[(competency, target)]
+        raised = {s for s in required.keys() & held.keys() if required[s] > held[s]}
+        missing = (required.keys() - held.keys()) | raised
+        held_certifications = set(self._certifications[(competency, source)])
+        # Target order is kept, so prompts built from the gap are stable across processes
+        return ({s: rank for s, rank in required.items() if s in missing},
+                [c for c in self._certifications[(competency, target)] if c not in held_certifications])
+
+    def _build_gaps(self, competency, ladder):
+        for i, source in enumerate(ladder):
+            for target in ladder[i + 1:]:
+                self._gaps[(competency, source, target)] = self._gap(competency, source, target)
+
+    def ladder(self, competency: str) -> List[str]:
+        return list(self.ladders.get(competency, []))
+
+    def next_designation(self, competency: str, designation: str) -> Optional[str]:
+        ladder = self.ladders.get(competency, [])
+        if designation not in ladder:
+            return None
+        index = ladder.index(designation)
+        return ladder[index + 1] if index + 1 < len(ladder) else None
+
+    def path(self, competency: str, source: str, target: Optional[str] = None,
+             user_skill_ratings: Optional[Dict[str, str]] = None) -> Optional[Dict]:
+        """
+        Gap from source to target (default: the next designation) as {'competency', 'from',
+        'to', 'level', 'steps', 'skills', 'certifications'}, where skills maps each skill to
+        the proficiency needed. With user_skill_ratings, skills already rated at that
+        proficiency are left out. None when target is not above source on the ladder.
+        """
+        target = target or self.next_designation(competency, source)
+        gap = self._gaps.get((competency, source, target))
+        if gap is None:
+            return None
+        skills, certifications = gap
+        if user_skill_ratings:
+            skills = {s: rank for s, rank in skills.items() if _RANKS.get(user_skill_ratings.get(s), 0) < rank}
+        ladder = self.ladders[competency]
+        return {
+            'competency': competency,
+            'from': source,
+            'to': target,
+            'level': self.levels[(competency, target)],
+            'steps': ladder[ladder.index(source) + 1:ladder.index(target) + 1],
+            'skills': {s: PROFICIENCY_LABELS[rank - 1] for s, rank in skills.items()},
+            'certifications': list(certifications),
+        }
+
+    def batch_paths(self, queries: Iterable[Dict]) -> List[Optional[Dict]]:
+        """
+        path() for many employees at once. Each query is a dict with competency,
+        designation and optionally target and skill_ratings (the bulk_assess roster format).
+        """
+        return [self.path(q.get('competency', ''), q.get('designation', ''), q.get('target') or None,
+                          q.get('skill_ratings')) for q in queries]
@@ -0,0 +1,192 @@
+import difflib
+import re
+import threading
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from catalog import SKILL_LEVELS
+from level_assessment import LEVEL_CAPS, LEVELS, PROFICIENCY_LABELS
+
+# Share of a name's tokens that must overlap a framework skill for a partial match
+FUZZY_TOKEN_OVERLAP = 0.5
+# difflib ratio for typo matches when no token overlaps
+FUZZY_RATIO = 0.85
+# Profiles scored per block in top_fits_many, bounding the (profiles x designations) counts
+BATCH_SIZE = 256
+
+_RANKS = {label: i for i, label in enumerate(PROFICIENCY_LABELS, start=1)}
+_TOKEN = re.compile(r"[a-z0-9+#]+")
+
+
+def _tokens(text: str) -> List[str]:
+    # Lowercase word tokens, plural "s" dropped ("Collections" and "collection" agree)
+    return [t[:-1] if len(t) > 3 and t.endswith("s") and not t.endswith("ss") else t
+            for t in _TOKEN.findall(text.lower())]
+
+
+def normalize_skill(name: str) -> str:
+    return " ".join(_tokens(name))
+
+
+def _aliases(name: str) -> List[str]:
+    # Shorter spellings of a framework skill: without its parenthetical, the parenthetical's
+    # items, and each side of a slash ("IDE (PyCharm)" -> "ide", "pycharm"; "Flask/Django" -> "flask", "django")
+    aliases = [re.sub(r"\([^)]*\)?", " ", name)]
+    aliases += re.findall(r"\(([^)]*)\)?", name)
+    for part in list(aliases):
+        if "/" in part:
+            aliases += part.split("/")
+    return [alias for alias in (normalize_skill(a) for a in aliases) if alias]
+
+
+class SkillIndex:
+    """
+    Inverted index from normalized skill names to (competency, designation, level) postings
+    over the whole framework. A posting holds the proficiency the designation expects:
+    the skill's framework column, capped at the designation's career level as in
+    LevelAssessor. Postings are stored column-wise (CSC), so scoring a profile touches only
+    the postings of the skills it rates, and every designation is scored at once.
+    """
+    def __init__(self, competency_data):
+        self.designations: List[Tuple[str, str, str]] = []
+        self.skills: List[str] = []
+        columns: Dict[str, int] = {}
+        entries = []
+        for competency in competency_data.get_competencies():
+            for designation in dict.fromkeys(competency_data.get_designations(competency) if competency else []):
+                level = competency_data.get_level_for_designation(competency, designation)
+                cap = int(LEVEL_CAPS[LEVELS.index(level)]) if level in LEVELS else len(SKILL_LEVELS)
+                row = len(self.designations)
+                self.designations.append((competency, designation, level))
+                expected = {}
+                skills_dict = competency_data.get_skills_for_designation(competency, designation)
+                for rank, column in enumerate(SKILL_LEVELS, start=1):
+                    for skill in skills_dict.get(column, []):
+                        key = normalize_skill(skill)
+                        if not key:
+                            continue
+                        if key not in columns:
+                            columns[key] = len(self.skills)
+                            self.skills.append(skill)
+                        expected.setdefault(columns[key], min(rank, cap))
+                entries += [(col, row, rank) for col, rank in expected.items()]
+
+        entries.sort()
+        cols = np.array([e[0] for e in entries], dtype=np.int64)
+        self._rows = np.array([e[1] for e in entries], dtype=np.int64)
+        self._expected = np.array([e[2] for e in entries], dtype=np.int8)
+        self._indptr = np.searchsorted(cols, np.arange(len(self.skills) + 1))
+        self._totals = np.bincount(self._rows, minlength=len(self.designations)).astype(np.float32)
+        self._level_order = np.array([LEVELS.index(level) if level in LEVELS else -1
+                                      for _, _, level in self.designations], dtype=np.int64)
+
+        # Normalization table: exact normalized names first, then aliases that no exact name claims
+        self._table: Dict[str, Tuple[int, ...]] = {key: (col,) for key, col in columns.items()}
+        derived: Dict[str, List[int]] = {}
+        for col, skill in enumerate(self.skills):
+            for alias in _aliases(skill):
+                if alias not in self._table:
+                    derived.setdefault(alias, []).append(col)
+        self._table.update((alias, tuple(dict.fromkeys(cols))) for alias, cols in derived.items())
+        self._token_sets = [set(key.split()) for key in columns]
+        self._token_postings: Dict[str, List[int]] = {}
+        for col, tokens in enumerate(self._token_sets):
+            for token in tokens:
+                self._token_postings.setdefault(token, []).append(col)
+        self._resolved: Dict[str, Tuple[int, ...]] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, name: str) -> Tuple[int, ...]:
+        """
+        Skill columns a user-supplied skill name stands for: exact or alias match in the
+        normalization table, else the framework skills sharing most of its tokens, else a
+        close spelling. Empty if nothing matches. Results are memoized per name.
+        """
+        cached = self._resolved.get(name)
+        if cached is not None:
+            return cached
+        key = normalize_skill(name)
+        found = self._table.get(key, ())
+        if not found and key:
+            tokens = set(key.split())
+            overlap: Dict[int, int] = {}
+            for token in tokens:
+                for col in self._token_postings.get(token, []):
+                    overlap[col] = overlap.get(col, 0) + 1
+            scores = {col: count / len(tokens | self._token_sets[col]) for col, count in overlap.items()}
+            best = max(scores.values(), default=0.0)
+            if best >= FUZZY_TOKEN_OVERLAP:
+                found = tuple(col for col, score in scores.items() if score == best)
+            else:
+                close = difflib.get_close_matches(key, list(self._table), n=1, cutoff=FUZZY_RATIO)
+                found = self._table[close[0]] if close else ()
+        with self._lock:
+            if len(self._resolved) > 100_000:
+                self._resolved.clear()
+            self._resolved[name] = found
+        return found
+
+    def encode(self, user_skill_ratings: Dict[str, str]) -> Tuple[np.ndarray, np.ndarray]:
+        # (columns, ranks) of a profile; labels or 1..5 ranks, the highest rating wins per column
+        ranks: Dict[int, int] = {}
+        for name, rating in user_skill_ratings.items():
+            rank = rating if isinstance(rating, int) else _RANKS.get(str(rating), 0)
+            for col in self.resolve(name) if rank else ():
+                ranks[col] = max(ranks.get(col, 0), rank)
+        return np.fromiter(ranks.keys(), dtype=np.int64, count=len(ranks)), \
+            np.fromiter(ranks.values(), dtype=np.int64, count=len(ranks))
+
+    def _met(self, profile_ids: np.ndarray, cols: np.ndarray, ranks: np.ndarray, profiles: int) -> np.ndarray:
+        # Met expectations per (profile, designation): gather the rated skills' postings and count
+        starts, ends = self._indptr[cols], self._indptr[cols + 1]
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.zeros((profiles, len(self.designations)), dtype=np.float32)
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        met = np.repeat(ranks, lengths) >= self._expected[offsets]
+        flat = np.repeat(profile_ids, lengths)[met] * len(self.designations) + self._rows[offsets][met]
+        return np.bincount(flat, minlength=profiles * len(self.designations)).reshape(
+            profiles, len(self.designations)).astype(np.float32)
+
+    def _top(self, met: np.ndarray, top_k: int) -> List[Dict]:
+        candidates = np.flatnonzero(met)
+        if not len(candidates):
+            return []
+        coverage = met[candidates] / self._totals[candidates]
+        # Best coverage first; among equal coverage, the more senior designation and more skills met
+        order = np.lexsort((-met[candidates], -self._level_order[candidates], -coverage))[:top_k]
+        fits = []
+        for i in order:
+            row = int(candidates[i])
+            competency, designation, level = self.designations[row]
+            fits.append({
+                'competency': competency,
+                'designation': designation,
+                'level': level,
+                'coverage': round(float(coverage[i]), 4),
+                'met': int(met[row]),
+                'gaps': int(self._totals[row] - met[row]),
+                'skills': int(self._totals[row]),
+            })
+        return fits
+
+    def top_fits(self, user_skill_ratings: Dict[str, str], top_k: int = 5) -> List[Dict]:
+        """
+        The top_k designations across all competencies that the ratings fit best, as dicts
+        with competency, designation, level, coverage (share of expected proficiencies met),
+        met, gaps and skills counts. Designations with nothing met are left out.
+        """
+        cols, ranks = self.encode(user_skill_ratings)
+        return self._top(self._met(np.zeros(len(cols), dtype=np.int64), cols, ranks, 1)[0], top_k)
+
+    def top_fits_many(self, ratings_list: Sequence[Dict[str, str]], top_k: int = 5) -> List[List[Dict]]:
+        """top_fits for many profiles, scored BATCH_SIZE profiles per vectorized pass."""
+        results = []
+        for start in range(0, len(ratings_list), BATCH_SIZE):
+            block = [self.encode(ratings) for ratings in ratings_list[start:start + BATCH_SIZE]]
+            profile_ids = np.repeat(np.arange(len(block)), [len(cols) for cols, _ in block])
+            cols = np.concatenate([cols for cols, _ in block]) if block else np.zeros(0, dtype=np.int64)
+            ranks = np.concatenate([ranks for _, ranks in block]) if block else np.zeros(0, dtype=np.int64)
+            met = self._met(profile_ids, cols, ranks, len(block))
+            results += [self._top(row, top_k) for row in met]
+        return results
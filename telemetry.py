@@ -0,0 +1,199 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Optional
+
+# Tracing is off unless TELEMETRY_ENABLED is set; disabled spans cost one flag check
+ENABLED = os.getenv("TELEMETRY_ENABLED", "").lower() in ("1", "true", "yes")
+JSONL_PATH = os.getenv("TELEMETRY_JSONL_PATH")
+PROMETHEUS_PORT = os.getenv("TELEMETRY_PROMETHEUS_PORT")
+
+# Upper bounds in seconds for latency histograms, and in units for size histograms
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 100000)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._events = None
+
+    def observe(self, name, value, buckets):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(buckets)
+            histogram.observe(value)
+
+    def emit(self, event):
+        if not JSONL_PATH:
+            return
+        if self._events is None:
+            with self._lock:
+                if self._events is None:
+                    from logging.handlers import RotatingFileHandler
+                    handler = RotatingFileHandler(JSONL_PATH, maxBytes=50 * 1024 * 1024, backupCount=5)
+                    handler.setFormatter(logging.Formatter("%(message)s"))
+                    events = logging.getLogger("skill_pilot.telemetry")
+                    events.propagate = False
+                    events.setLevel(logging.INFO)
+                    events.addHandler(handler)
+                    self._events = events
+        self._events.info(json.dumps(event, default=str))
+
+    def prometheus_text(self):
+        lines = []
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                metric = "skill_pilot_" + name.replace(".", "_")
+                lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{le="+Inf"}} {histogram.count}')
+                lines.append(f"{metric}_sum {histogram.sum}")
+                lines.append(f"{metric}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+registry = _Registry()
+
+
+class Span:
+    """
+    Times a block of work. Numeric attributes set on the span are also recorded as
+    histograms named "<span>.<attribute>".
+    """
+    __slots__ = ("name", "attributes", "start")
+
+    def __init__(self, name, attributes=None):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.start = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        registry.observe(f"{self.name}.seconds", duration, LATENCY_BUCKETS)
+        for key, value in self.attributes.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                buckets = LATENCY_BUCKETS if key.endswith("seconds") else SIZE_BUCKETS
+                registry.observe(f"{self.name}.{key}", value, buckets)
+        registry.emit({
+            "ts": time.time(),
+            "span": self.name,
+            "seconds": round(duration, 6),
+            "error": exc_type.__name__ if exc_type else None,
+            **self.attributes,
+        })
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name, **attributes):
+    if not ENABLED:
+        return _NOOP
+    return Span(name, attributes)
+
+
+def traced(name):
+    """Decorator form of span() for whole functions and methods."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with Span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def enable(jsonl_path: Optional[str] = None):
+    global ENABLED, JSONL_PATH
+    ENABLED = True
+    if jsonl_path:
+        JSONL_PATH = jsonl_path
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+
+_server = None
+
+
+def start_metrics_server(port: int):
+    """Serves registry.prometheus_text() at http://0.0.0.0:<port>/metrics from a daemon thread."""
+    global _server
+    if _server is not None:
+        return _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    _server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
+
+
+if ENABLED and PROMETHEUS_PORT:
+    start_metrics_server(int(PROMETHEUS_PORT))
@@ -1,24 +1,11 @@
 import os
 import dspy
-from groq import Groq
-from vector_store import DesignationVectorStore
-import streamlit
+# Route LLM calls to Groq (llama3-70b) unless LLM_PROVIDERS says otherwise
+os.environ.setdefault("LLM_PROVIDERS", "groq")
+from llm_router import get_router
 from career_advisor import CareerAdvisor  # Use the refactored class
 
-# Manually configure LLM (Groq)
-from groq import Groq  # Assuming this is how you import Groq
-
-# Step 1: Manually configure Groq LLM
-groq_api_key = os.getenv("GROQ_API_KEY")
-
-dspy.configure(lm=(
-    dspy.LM(
-        model="groq/llama3-70b-8192",
-        api_key=groq_api_key
-    )
-))
-
-# Step 2: Define Career Advisor Signature & Module
+# Define Career Advisor Signature & Module
 class CareerPathSignature(dspy.Signature):
     current_designation = dspy.InputField(desc="The employee's current job title")
     desired_designation = dspy.InputField(desc="The desired next job title")
@@ -31,11 +18,13 @@ class CareerAdvisor(dspy.Module):
         self.predict = dspy.Predict(CareerPathSignature)
 
     def forward(self, current_designation, desired_designation, retrieved_skills):
-        return self.predict(
-            current_designation=current_designation,
-            retrieved_skills=retrieved_skills,
-            desired_designation=desired_designation
-        )
+        # The primary provider's LM is built on the first call, not at import
+        with dspy.context(lm=get_router().providers[0].lm):
+            return self.predict(
+                current_designation=current_designation,
+                retrieved_skills=retrieved_skills,
+                desired_designation=desired_designation
+            )
 
     def enhance_performance_metrics(self, designation, base_metrics, skills):
         prompt = (
@@ -44,7 +33,7 @@ class CareerAdvisor(dspy.Module):
             f"Respond in 2-3 bullet points."
         )
         # Use LLM to generate enhancement
-        return dspy.LM()(prompt)
+        return get_router().complete(prompt)
 
     def enhance_developmental_activities(self, designation, base_activities, skills):
         prompt = (
@@ -53,4 +42,4 @@ class CareerAdvisor(dspy.Module):
             f"Respond in 2-3 bullet points."
         )
         # Use LLM to generate enhancement
-        return dspy.LM()(prompt)
\ No newline at end of file
+        return get_router().complete(prompt)
\ No newline at end of file
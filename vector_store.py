@@ -1,43 +1,379 @@
+import copy
+import hashlib
 import json
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
-import pandas as pd  # Added for CSV support
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+import numpy as np
+from catalog import skill_texts
+from numpy_index import NumpyCollection
+from telemetry import span
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+
+def _iter_records(file_path, chunk_size):
+    # Yield (designations, skill texts) chunks without reading the whole file into memory
+    if file_path.endswith('.csv'):
+        # Streamed rather than read from the catalog snapshot, which holds the whole file; the
+        # texts match the snapshot's, so retrieval maps results back to its rows
+        import pandas as pd
+        for df in pd.read_csv(file_path, chunksize=chunk_size):
+            yield skill_texts(df, file_path)
+    elif file_path.endswith('.jsonl'):
+        designations, skills = [], []
+        with open(file_path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                designations.append(entry["designation"])
+                skills.append("\n".join(entry["skills_required"]))
+                if len(designations) == chunk_size:
+                    yield designations, skills
+                    designations, skills = [], []
+        if designations:
+            yield designations, skills
+    else:
+        with open(file_path, "r") as f:
+            data = json.load(f)
+        for start in range(0, len(data), chunk_size):
+            chunk = data[start:start + chunk_size]
+            yield [e["designation"] for e in chunk], ["\n".join(e["skills_required"]) for e in chunk]
+
+
+def document_text(designation, skill_text):
+    # The indexed text of a row; its SHA-256 is the content_hash in the document's metadata
+    return f"Designation: {designation}\nSkills: {skill_text}"
+
+
+def _iter_documents(file_path, chunk_size):
+    # Yield (ids, texts, metadatas) chunks; ids come from the content, so they survive reorders and inserts
+    seen = Counter()
+    for designations, skills in _iter_records(file_path, chunk_size):
+        ids, texts, metadatas = [], [], []
+        for designation, skill_text in zip(designations, skills):
+            text = document_text(designation, skill_text)
+            content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            # Exact duplicate rows get their occurrence number so ids stay unique
+            key = f"{content_hash}#{seen[content_hash]}"
+            seen[content_hash] += 1
+            ids.append("designation_" + hashlib.sha256(key.encode("utf-8")).hexdigest()[:16])
+            texts.append(text)
+            metadatas.append({"designation": designation, "content_hash": content_hash})
+        yield ids, texts, metadatas
+
+
+class EmbeddingCache:
+    """On-disk float32 embeddings keyed by (model name, SHA-256 of the text)."""
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+
+    def get_many(self, model, hashes):
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), 500):
+            part = unique[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(part))})",
+                [model, *part],
+            ).fetchall()
+            found.update((h, np.frombuffer(v, dtype=np.float32)) for h, v in rows)
+        return found
+
+    def put_many(self, model, items):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+            [(model, h, np.asarray(v, dtype=np.float32).tobytes()) for h, v in items],
+        )
+
+
+class _LRU:
+    """Small thread-safe LRU mapping."""
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Heavy resources are created on first use and shared by every instance in the process
+_shared = {}
+_shared_lock = threading.RLock()
+_query_embeddings = _LRU(4096)
+_query_results = _LRU(1024)
+# persist_dir -> (signature of the store's files, collection stamp)
+_stamps = {}
+
+
+def _shared_resource(key, factory):
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = factory()
+        return _shared[key]
+
+
+def _split_results(results, count):
+    # Chroma returns one list per query embedding; split them into single-query results
+    split = []
+    for i in range(count):
+        split.append({
+            key: (value if key == "included" or value is None else [value[i]])
+            for key, value in results.items()
+        })
+    return split
+
+
+def _sentence_transformer():
+    # sentence-transformers (and torch) are only imported once something needs encoding
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL)
+
+
+def _chroma_client(persist_dir):
+    # chromadb is only needed (and imported) for the Chroma backend
+    import chromadb
+    from chromadb.config import Settings
+    return chromadb.PersistentClient(path=persist_dir, settings=Settings(allow_reset=True))
+
 
 class DesignationVectorStore:
-    def __init__(self, persist_dir="chromadb_store"):
-        self.client = chromadb.PersistentClient(path=persist_dir, settings=Settings(allow_reset=True))
-        self.collection = self.client.get_or_create_collection(name="designations")
-        self.embedder = SentenceTransformer("all-MiniLM-L6-v2")
-
-    def load_data(self, file_path):
-        if file_path.endswith('.csv'):
-            df = pd.read_csv(file_path)
-            data = []
-            for _, row in df.iterrows():
-                # Collect all skill columns (Basic, Intermediate, Competent, Advanced, Expert)
-                skills = [str(row.get(col, '')) for col in ["Basic", "Intermediate", "Competent", "Advanced", "Expert"] if pd.notna(row.get(col, ''))]
-                data.append({
-                    "designation": row["Competency Name"],
-                    "skills_required": skills
-                })
-        else:
-            with open(file_path, "r") as f:
-                data = json.load(f)
-
-        for i, entry in enumerate(data):
-            text = f"Designation: {entry['designation']}\nSkills: " + "\n".join(entry["skills_required"])
-            embedding = self.embedder.encode(text).tolist()
-
-            self.collection.add(
-                ids=[f"designation_{i}"],
-                documents=[text],
-                embeddings=[embedding],
-                metadatas=[{"designation": entry["designation"]}]
+    """
+    Designation embeddings searchable by free text. backend is "chroma" (persistent Chroma
+    collection) or "numpy" (NumpyCollection exact search under persist_dir/numpy_index,
+    optionally quantized to "float16" or "int8"). An embedder object with a
+    SentenceTransformer-compatible encode() can be passed in place of the shared model.
+    """
+    def __init__(self, persist_dir="chromadb_store", backend=None, quantization=None, embedder=None):
+        self.persist_dir = os.path.abspath(persist_dir)
+        self._embedder = embedder
+        # Cached embeddings are keyed by model, so a custom embedder never reads the shared model's vectors
+        self.model_name = EMBEDDING_MODEL if embedder is None else type(embedder).__name__
+        self.backend = backend or os.getenv("VECTOR_BACKEND", "chroma")
+        self.quantization = quantization or os.getenv("VECTOR_QUANTIZATION") or None
+        if self.backend not in ("chroma", "numpy"):
+            raise ValueError(f"Unknown vector store backend: {self.backend}")
+
+    @property
+    def client(self):
+        return _shared_resource(("client", self.persist_dir), lambda: _chroma_client(self.persist_dir))
+
+    @property
+    def collection(self):
+        if self.backend == "numpy":
+            return _shared_resource(("numpy", self.persist_dir, self.quantization), lambda: NumpyCollection(
+                os.path.join(self.persist_dir, "numpy_index"), quantization=self.quantization
+            ))
+        return _shared_resource(("collection", self.persist_dir),
+                                lambda: self.client.get_or_create_collection(name="designations"))
+
+    @property
+    def embedder(self):
+        if self._embedder is not None:
+            return self._embedder
+        return _shared_resource(("embedder", EMBEDDING_MODEL), _sentence_transformer)
+
+    @property
+    def embedding_cache(self):
+        return _shared_resource(("embedding_cache", self.persist_dir), lambda: EmbeddingCache(
+            os.path.join(self.persist_dir, "embedding_cache.sqlite3")
+        ))
+
+    def _store_files(self):
+        # Files that every write to the collection changes
+        if self.backend == "numpy":
+            return [os.path.join(self.persist_dir, "numpy_index", "records.jsonl")]
+        return [os.path.join(self.persist_dir, name) for name in ("chroma.sqlite3", "chroma.sqlite3-wal")]
+
+    def exists(self):
+        # Whether the store has been built (load_data.py); a stat, so neither chromadb nor the model is loaded
+        return os.path.exists(self._store_files()[0])
+
+    def stamp(self):
+        """
+        Persisted state of the collection: its document count and a digest of the document
+        ids, which carry the content hashes. Recomputed only when the store's files change
+        on disk, so writes by another process (load_data.py) change it too.
+        """
+        signature = []
+        for path in self._store_files():
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        key = (self.persist_dir, self.backend)
+        with _shared_lock:
+            cached = _stamps.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        ids = sorted(self.collection.get(include=[])["ids"])
+        stamp = f"{len(ids)}:{hashlib.sha256(chr(10).join(ids).encode('utf-8')).hexdigest()[:16]}"
+        with _shared_lock:
+            _stamps[key] = (signature, stamp)
+        return stamp
+
+    def invalidate(self):
+        # Cached query results are keyed by the stamp; forgetting it makes the next query recompute it
+        with _shared_lock:
+            _stamps.pop((self.persist_dir, self.backend), None)
+
+    def _max_chunk(self, chunk_size):
+        if self.backend != "chroma":
+            return chunk_size
+        max_batch = getattr(self.client, "get_max_batch_size", lambda: chunk_size)()
+        return min(chunk_size, max_batch)
+
+    def _embed(self, texts, batch_size):
+        # Only texts never seen by this model are encoded; the rest come from the cache
+        hashes = [hashlib.sha256(t.encode("utf-8")).hexdigest() for t in texts]
+        cached = self.embedding_cache.get_many(self.model_name, hashes)
+        missing = list(dict.fromkeys(h for h in hashes if h not in cached))
+        if missing:
+            by_hash = dict(zip(hashes, texts))
+            with span("vector.encode", texts=len(missing)):
+                encoded = self.embedder.encode(
+                    [by_hash[h] for h in missing], batch_size=batch_size, convert_to_numpy=True
+                )
+            fresh = list(zip(missing, encoded.astype(np.float32)))
+            self.embedding_cache.put_many(self.model_name, fresh)
+            cached.update(fresh)
+        return np.stack([cached[h] for h in hashes]) if hashes else np.zeros((0, 0), dtype=np.float32)
+
+    def load_data(self, file_path, chunk_size=1000, batch_size=64):
+        """
+        Streams a CSV, JSONL or JSON file in chunks of chunk_size rows; each chunk is embedded
+        with one batched encode call and written with one upsert.
+        """
+        start = time.perf_counter()
+        total = 0
+        for ids, texts, metadatas in _iter_documents(file_path, self._max_chunk(chunk_size)):
+            self.collection.upsert(
+                ids=ids,
+                documents=texts,
+                embeddings=self._embed(texts, batch_size).tolist(),
+                metadatas=metadatas
             )
+            total += len(texts)
+        self.invalidate()
+
+        elapsed = time.perf_counter() - start
+        print(f"✅ Loaded {total} records into the {self.backend} store in {elapsed:.2f}s "
+              f"({total / elapsed if elapsed else 0:.0f} rows/s).")
+
+    def sync(self, file_path, chunk_size=1000, batch_size=64):
+        """
+        Incrementally brings the collection in line with file_path: only new or changed
+        documents are embedded and written, and documents no longer in the file are deleted.
+        Returns the counts of added, updated, deleted and unchanged rows.
+        """
+        start = time.perf_counter()
+        existing = self.collection.get(include=["metadatas"])
+        existing_designations = {
+            doc_id: (meta or {}).get("designation") for doc_id, meta in zip(existing["ids"], existing["metadatas"])
+        }
+        added = Counter()
+        unchanged = 0
+        seen_ids = set()
+        for ids, texts, metadatas in _iter_documents(file_path, self._max_chunk(chunk_size)):
+            new = []
+            for i, (doc_id, meta) in enumerate(zip(ids, metadatas)):
+                seen_ids.add(doc_id)
+                if doc_id in existing_designations:
+                    unchanged += 1
+                else:
+                    added[meta["designation"]] += 1
+                    new.append(i)
+            if new:
+                new_texts = [texts[i] for i in new]
+                self.collection.upsert(
+                    ids=[ids[i] for i in new],
+                    documents=new_texts,
+                    embeddings=self._embed(new_texts, batch_size).tolist(),
+                    metadatas=[metadatas[i] for i in new]
+                )
+
+        stale = [doc_id for doc_id in existing_designations if doc_id not in seen_ids]
+        step = self._max_chunk(chunk_size)
+        for offset in range(0, len(stale), step):
+            self.collection.delete(ids=stale[offset:offset + step])
+
+        if added or stale:
+            self.invalidate()
+
+        # A changed row shows up as a new id plus a stale one for the same designation
+        deleted = Counter(existing_designations[doc_id] for doc_id in stale)
+        updated = sum(min(count, deleted[designation]) for designation, count in added.items())
+        summary = {
+            "added": sum(added.values()) - updated,
+            "updated": updated,
+            "deleted": sum(deleted.values()) - updated,
+            "unchanged": unchanged,
+        }
+        elapsed = time.perf_counter() - start
+        print(f"✅ Synced {file_path} in {elapsed:.2f}s: {summary['added']} added, {summary['updated']} updated, "
+              f"{summary['deleted']} deleted, {summary['unchanged']} unchanged.")
+        return summary
+
+    def _query_embeddings(self, inputs, batch_size=64):
+        # Inputs seen before reuse their embedding; the rest are encoded in one batch
+        embeddings = {text: _query_embeddings.get((self.model_name, text)) for text in inputs}
+        missing = [text for text, emb in embeddings.items() if emb is None]
+        if missing:
+            with span("vector.encode_queries", texts=len(missing)):
+                encoded = self.embedder.encode(missing, batch_size=batch_size, convert_to_numpy=True)
+            for text, emb in zip(missing, encoded):
+                emb = emb.tolist()
+                _query_embeddings.put((self.model_name, text), emb)
+                embeddings[text] = emb
+        return embeddings
 
-        print(f"✅ Loaded {len(data)} records into ChromaDB.")
+    def query_many(self, inputs, top_k=3, where=None):
+        """
+        Queries several inputs at once: unseen inputs are encoded in one batch and searched
+        with one collection query. Returns one Chroma-style result per input; results are
+        copies, so callers may modify them without touching the cache.
+        """
+        scope = (self.persist_dir, self.backend, self.quantization, self.model_name,
+                 self.stamp(), top_k, json.dumps(where, sort_keys=True))
+        results = [_query_results.get(scope + (text,)) for text in inputs]
+        pending = list(dict.fromkeys(text for text, result in zip(inputs, results) if result is None))
+        if pending:
+            embeddings = self._query_embeddings(pending)
+            with span("vector.search", queries=len(pending), backend=self.backend):
+                found = self.collection.query(
+                    query_embeddings=[embeddings[text] for text in pending], n_results=top_k, where=where
+                )
+            fresh = dict(zip(pending, _split_results(found, len(pending))))
+            for text, result in fresh.items():
+                _query_results.put(scope + (text,), result)
+            results = [result if result is not None else fresh[text] for text, result in zip(inputs, results)]
+        return [copy.deepcopy(result) for result in results]
 
-    def query(self, user_input, top_k=3):
-        embedding = self.embedder.encode(user_input).tolist()
-        return self.collection.query(query_embeddings=[embedding], n_results=top_k)
+    def query(self, user_input, top_k=3, where=None):
+        return self.query_many([user_input], top_k=top_k, where=where)[0]